@@ -1,35 +1,61 @@
+import itertools
+import math
+import multiprocessing
 import re
 import numpy as np
 import os
 import time
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, without it the kernels run as plain Python functions
+    def njit(*args, **kwargs):
+        return lambda func: func
 
-def insert_Z(row, z_value):
+# Patterns of the G-Code parameters, compiled once and shared by all functions
+_RE_E = re.compile(r'E[-0-9]+[.]?[0-9]*')
+_RE_U = re.compile(r'U[-0-9]+[.]?[0-9]*')
+# All parameters in one pattern, such that a row is scanned only once; the group name is the letter of the parameter
+_RE_FIELDS = re.compile(r'(?P<X>X[-0-9]+[.]?[0-9]*)|(?P<Y>Y[-0-9]+[.]?[0-9]*)|(?P<Z>Z[-0-9]+[.]?[0-9]*)|'
+                        r'(?P<E>E[-0-9]+[.]?[0-9]*)|(?P<U>U[-0-9]+[.]?[0-9]*)')
+
+# Constants of the per-row arithmetic, computed once instead of in every row
+_INV_SQRT2 = 1.0 / math.sqrt(2.0)
+_TWO_PI = 2.0 * math.pi
+_RAD2DEG = math.degrees(1.0)
+
+# Number of sub-segments, for which the buffers of the backtransformation are allocated initially
+_BUFFER_SIZE = 64
+# Number of rows, which are read at once and whose segments are computed together
+_BATCH_SIZE = 1024
+
+
+def insert_Z(row, z_string, fields):
     """
-    Insert or replace the z-value in a row. The new z-value must be given.
+    Insert or replace the z-value in a row. The new z-value must be given as formatted string; the row is not searched
+    again, the positions of its parameters are taken from fields.
     :param row: string
         String containing the row, in which a z-value has to be inserted or replaced
-    :param z_value: float
-        New z-value, which should be inserted
+    :param z_string: string
+        New z-value including the letter, e.g. 'Z1.000', which should be inserted
+    :param fields: dict
+        Matches of the parameters of the row, as returned by find_fields
     :return: string
         New string, containing the row with replaced z-value
     """
-    pattern_X = r'X[-0-9]+[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]+[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]+[.]?[0-9]*'
-    match_x = re.search(pattern_X, row)
-    match_y = re.search(pattern_Y, row)
-    match_z = re.search(pattern_Z, row)
+    match_z = fields.get('Z')
+    match_y = fields.get('Y')
+    match_x = fields.get('X')
 
     if match_z is not None:
-        row_new = re.sub(pattern_Z, ' Z' + str(round(z_value, 3)), row)
+        row_new = row[0:match_z.start(0)] + ' ' + z_string + row[match_z.end(0):]
     else:
         if match_y is not None:
-            row_new = row[0:match_y.end(0)] + ' Z' + str(round(z_value, 3)) + row[match_y.end(0):]
+            row_new = row[0:match_y.end(0)] + ' ' + z_string + row[match_y.end(0):]
         elif match_x is not None:
-            row_new = row[0:match_x.end(0)] + ' Z' + str(round(z_value, 3)) + row[match_x.end(0):]
+            row_new = row[0:match_x.end(0)] + ' ' + z_string + row[match_x.end(0):]
         else:
-            row_new = 'Z' + str(round(z_value, 3)) + ' ' + row
+            row_new = z_string + ' ' + row
     return row_new
 
 
@@ -50,17 +76,16 @@ def replace_E(row, dist_old, dist_new, corr_value):
     :return: string
         New string, containing the row with replaced extruder value
     """
-    pattern_E = r'E[-0-9]+[.]?[0-9]*'
-    match_e = re.search(pattern_E, row)
+    match_e = _RE_E.search(row)
     if match_e is None:
         return row
-    e_val_old = float(match_e.group(0).replace('E', ''))
+    start, end = match_e.span()
+    e_val_old = float(row[start + 1:end])
     if dist_old == 0:
         e_val_new = 0
     else:
-        e_val_new = round(e_val_old * dist_new * corr_value / dist_old, 6)
-    e_str_new = 'E' + str(e_val_new)
-    row_new = row[0:match_e.start(0)] + e_str_new + row[match_e.end(0):]
+        e_val_new = e_val_old * dist_new * corr_value / dist_old
+    row_new = f'{row[:start]}E{e_val_new:.6f}{row[end:]}'
     return row_new
 
 
@@ -79,9 +104,9 @@ def compute_angle_radial(x_new, y_new, inward_cone):
     :return: float
         Angle, which describes orientation of printing head. Its value lies in [-pi, pi].
     """
-    angle = np.arctan2(y_new, x_new)
+    angle = math.atan2(y_new, x_new)
     if inward_cone:
-        angle = angle + np.pi
+        angle = angle + math.pi
     return angle
 
 
@@ -105,22 +130,21 @@ def compute_angle_tangential(x_old, y_old, x_new, y_new, inward_cone):
     :return: float
         Angle, which describes orientation of printing head. Its value lies in [-pi, pi].
     """
-    direction_normal = np.array([-(y_new - y_old), x_new - x_old])
-    len_normal = np.linalg.norm(direction_normal)
-    direction_point = np.array([x_new, y_new])
-    len_point = np.linalg.norm(direction_point)
+    normal_x, normal_y = -(y_new - y_old), x_new - x_old
+    len_normal = math.sqrt(normal_x * normal_x + normal_y * normal_y)
+    len_point = math.sqrt(x_new * x_new + y_new * y_new)
     if len_normal * len_point == 0:
-        angle = np.arctan2(y_new, x_new)
+        angle = math.atan2(y_new, x_new)
     else:
-        inner_prod = np.dot(direction_normal / len_normal, direction_point / len_point)
-        if np.isclose(inner_prod, 0, atol=0.01):
-            angle = np.arctan2(direction_normal[1], direction_normal[0])
+        inner_prod = normal_x / len_normal * (x_new / len_point) + normal_y / len_normal * (y_new / len_point)
+        if abs(inner_prod) <= 0.01:
+            angle = math.atan2(normal_y, normal_x)
         else:
-            printhead_direction = inner_prod * len_point / len_normal * direction_normal
-            angle = np.arctan2(printhead_direction[1], printhead_direction[0])
+            factor = inner_prod * len_point / len_normal
+            angle = math.atan2(factor * normal_y, factor * normal_x)
 
     if inward_cone:
-        angle = angle + np.pi
+        angle = angle + math.pi
 
     return angle
 
@@ -128,77 +152,295 @@ def compute_angle_tangential(x_old, y_old, x_new, y_new, inward_cone):
 def compute_U_values(angle_array):
     """
     Compute the U-values, which will be inserted, according to given angle values. The U-values are computed such that
-    there are no changes larger than 180. The range of the U-values is [-3600-180, 3600+180].
+    there are no changes larger than 180. (The successive differences are wrapped to [-pi, pi) and summed up, which
+    unwraps the angles in one vectorized pass.)
     :param angle_array: array
         Array, which contains the angle values in radian
     :return array
         Array, which contains U-values in degrees
     """
-    angle_candidates = np.around(np.array([angle_array + k * 2 * np.pi for k in range(-10, 11)]).T, 4)
-    angle_insert = [angle_array[0]]
-    for i in range(1, len(angle_array)):
-        angle_prev = angle_insert[i - 1]
-        idx = np.argmin(np.absolute(angle_candidates[i] - angle_prev))
-        angle_insert.append(angle_candidates[i, idx])
+    diffs = np.diff(angle_array)
+    diffs = (diffs + np.pi) % _TWO_PI - np.pi
+    angle_insert = np.concatenate(([angle_array[0]], angle_array[0] + np.cumsum(diffs)))
 
-    angle_insert = np.round(np.array(angle_insert) * 360 / (2 * np.pi), 2)
+    angle_insert = np.round(np.degrees(angle_insert), 2)
 
     return angle_insert
 
 
-def insert_U(row, angle):
+def _fill_template(row, fields):
     """
-    Insert or replace the U-value in a row, where the U-values describes the orientation of the printing head.
+    Replace the given spans of a row by fields of a format string; the rest of the row is escaped.
     :param row: string
-        String containing the row, in which a U-value has to be inserted or replaced
-    :param angle: float
-        Value of the angle, which is inserted or replaces the old U-value
+        String containing the row
+    :param fields: list
+        List of tuples (start, end, field), sorted by their position in the row
     :return: string
-        New string, containing the row with replaced U-value
+        Format string
     """
-    pattern_Z = r'Z[-0-9]+[.]?[0-9]*'
-    match_z = re.search(pattern_Z, row)
-    pattern_U = r'U[-0-9]+[.]?[0-9]*'
-    match_u = re.search(pattern_U, row)
+    template_parts = []
+    position = 0
+    for start, end, field in fields:
+        template_parts.append(row[position:start].replace('{', '{{').replace('}', '}}'))
+        template_parts.append(field)
+        position = end
+    template_parts.append(row[position:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(template_parts)
+
 
-    if match_u is None:
-        row_new = row[0:match_z.end(0)] + ' U' + str(angle) + row[match_z.end(0):]
+def movement_template(row, fields, with_e):
+    """
+    Convert a row into format strings, in which the x-, y-, z- and E-value are replaced by the fields {0}, {1}, {2} and
+    {3}. The row is not searched again, the spans of the values are taken from the matches of find_fields; the rows of
+    the sub-segments are then obtained with one call of str.format each. The second format string additionally
+    contains the field {4} for the U-value, which replaces the U-value of the row or is inserted after the z-value.
+    :param row: string
+        String containing the row, which is used as template for the sub-segments
+    :param fields: dict
+        Matches of the values of the row, as returned by find_fields
+    :param with_e: bool
+        If True, the E-value is replaced by the field {3}, otherwise it is kept
+    :return: tuple
+        Format string without and format string with the U-value, and the E-value of the row (None, if the E-value is
+        not replaced)
+    """
+    spans = []
+    for letter, field in (('X', 'X{0:.3f}'), ('Y', 'Y{1:.3f}'), ('Z', 'Z{2:.3f}')):
+        if letter in fields:
+            spans.append((fields[letter].start(0), fields[letter].end(0), field))
+    e_val = None
+    if with_e and 'E' in fields:
+        start, end = fields['E'].span()
+        e_val = float(row[start + 1:end])
+        spans.append((start, end, 'E{3:.6f}'))
+
+    if 'U' in fields:
+        spans_u = spans + [(fields['U'].start(0), fields['U'].end(0), 'U{4:.2f}')]
+    elif 'Z' in fields:
+        spans_u = spans + [(fields['Z'].end(0), fields['Z'].end(0), ' U{4:.2f}')]
     else:
-        row_new = re.sub(pattern_U, 'U' + str(angle), row)
+        spans_u = list(spans)
+    spans.sort()
+    spans_u.sort()
+    return _fill_template(row, spans), _fill_template(row, spans_u), e_val
+
+
+@njit(fastmath=True, cache=True)
+def _compute_segment(x_start, y_start, x_end, y_end, z_layer, c, num_segm, linear_z, has_e, z_max, x_vals, y_vals,
+                     z_vals, distances_bt):
+    """
+    Compute the backtransformed points of a segment, which is divided into num_segm sub-segments, and the lengths of the
+    sub-segments. Only scalar arithmetic is used, such that the function can be compiled with numba. The results are
+    written into the given arrays, which are reused for all segments.
+    :param x_start: float
+        backtransformed x-coordinate of the start point
+    :param y_start: float
+        backtransformed y-coordinate of the start point
+    :param x_end: float
+        backtransformed x-coordinate of the end point
+    :param y_end: float
+        backtransformed y-coordinate of the end point
+    :param z_layer: float
+        z-value of the layer in the transformed GCode
+    :param c: int
+        sign of the cone, -1 for 'outward' and 1 for 'inward'
+    :param num_segm: int
+        number of sub-segments
+    :param linear_z: bool
+        If True, the z-values are interpolated linearly between start and end point instead of following the cone
+        (travel moves of the inward cone)
+    :param has_e: bool
+        True, if material is extruded along the segment
+    :param z_max: float
+        highest point with material extruded so far
+    :param x_vals: array
+        array of length num_segm + 1, in which the x-values of the points are written
+    :param y_vals: array
+        array of length num_segm + 1, in which the y-values of the points are written
+    :param z_vals: array
+        array of length num_segm + 1, in which the z-values of the points are written
+    :param distances_bt: array
+        array of length num_segm, in which the lengths of the sub-segments are written
+    :return: float
+        updated z_max
+    """
+    for k in range(num_segm + 1):
+        x_vals[k] = x_start + (x_end - x_start) * k / num_segm
+        y_vals[k] = y_start + (y_end - y_start) * k / num_segm
+    if linear_z:
+        z_start = z_layer + c * math.sqrt(x_start * x_start + y_start * y_start)
+        z_end = z_layer + c * math.sqrt(x_end * x_end + y_end * y_end)
+        for k in range(num_segm + 1):
+            z_vals[k] = z_start + (z_end - z_start) * k / num_segm
+    else:
+        for k in range(num_segm + 1):
+            z_vals[k] = z_layer + c * math.sqrt(x_vals[k] * x_vals[k] + y_vals[k] * y_vals[k])
+        # seeded with the first value, fastmath lets numba assume that no infinities occur
+        z_highest = z_vals[0]
+        for k in range(1, num_segm + 1):
+            z_highest = max(z_highest, z_vals[k])
+        if has_e and (z_highest > z_max or z_max == 0):
+            z_max = z_highest  # save hightes point with material extruded
+        if not has_e and z_highest > z_max:
+            # cut away all travel moves, that are higher than max height extruded + 1 mm safety
+            for k in range(num_segm + 1):
+                z_vals[k] = min(z_vals[k], z_max + 1)
+            # das hier könnte noch verschönert werden, in dem dann alle abgeschnittenen Werte mit einer einer geraden Linie ersetzt werden
+    for k in range(num_segm):
+        dx = x_vals[k + 1] - x_vals[k]
+        dy = y_vals[k + 1] - y_vals[k]
+        dz = z_vals[k + 1] - z_vals[k]
+        distances_bt[k] = math.sqrt(dx * dx + dy * dy + dz * dz)
+    return z_max
+
+
+@njit(fastmath=True, cache=True)
+def _compute_single_segment(x_start, y_start, x_end, y_end, z_layer, c, linear_z, has_e, z_max):
+    """
+    Compute the backtransformed start and end point of a segment, which is not divided, and its length. Same as
+    _compute_segment with num_segm = 1, but the values are returned as tuples instead of being written into arrays,
+    since most segments are short. Like _compute_segment it is compiled with numba and cached on disk, such that it is
+    compiled only at the first run. (For the parameters see _compute_segment.)
+    :return: tuple
+        tuples x_vals, y_vals, z_vals of length 2, tuple distances_bt of length 1 and the updated z_max
+    """
+    z_start = z_layer + c * math.sqrt(x_start * x_start + y_start * y_start)
+    z_end = z_layer + c * math.sqrt(x_end * x_end + y_end * y_end)
+    if not linear_z:
+        z_highest = max(z_start, z_end)
+        if has_e and (z_highest > z_max or z_max == 0):
+            z_max = z_highest  # save hightes point with material extruded
+        if not has_e and z_highest > z_max:
+            # cut away all travel moves, that are higher than max height extruded + 1 mm safety
+            z_start = min(z_start, z_max + 1)
+            z_end = min(z_end, z_max + 1)
+    dx = x_end - x_start
+    dy = y_end - y_start
+    dz = z_end - z_start
+    distance_bt = math.sqrt(dx * dx + dy * dy + dz * dz)
+    return (x_start, x_end), (y_start, y_end), (z_start, z_end), (distance_bt,), z_max
+
+
+def parse_movement(fields):
+    """
+    Read the x-, y- and z-values of a movement row and check, if material is extruded. The values are read from the
+    matches of find_fields, such that they are parsed with the same patterns, with which they are replaced later.
+    :param fields: dict
+        Matches of the parameters of a G0 or G1 row, as returned by find_fields
+    :return: tuple
+        x-, y- and z-value of the row (None, if not given) and a bool, which is True if the row contains an E-value
+    """
+    x_val, y_val, z_val = None, None, None
+    if 'X' in fields:
+        x_val = float(fields['X'].group(0)[1:])
+    if 'Y' in fields:
+        y_val = float(fields['Y'].group(0)[1:])
+    if 'Z' in fields:
+        z_val = float(fields['Z'].group(0)[1:])
+    return x_val, y_val, z_val, 'E' in fields
+
+
+def segment_values(x_points, y_points, maximal_length):
+    """
+    Compute the backtransformed points, the lengths and the numbers of sub-segments of consecutive segments at once,
+    where the k-th segment goes from the k-th to the (k+1)-th point.
+    :param x_points: list
+        x-values of the points in the transformed GCode
+    :param y_points: list
+        y-values of the points in the transformed GCode
+    :param maximal_length: float
+        Maximal length of a segment in the original GCode
+    :return: tuple
+        lists with the backtransformed x- and y-values of the points, the lengths of the segments in the transformed
+        GCode and the numbers of sub-segments
+    """
+    x_points = np.array(x_points, dtype=float)
+    y_points = np.array(y_points, dtype=float)
+    dists_transformed = np.hypot(np.diff(x_points), np.diff(y_points))
+    nums_segm = np.maximum(1, np.ceil(dists_transformed / maximal_length)).astype(int)
+    return ((x_points * _INV_SQRT2).tolist(), (y_points * _INV_SQRT2).tolist(), dists_transformed.tolist(),
+            nums_segm.tolist())
+
+
+def angles_radial(x_old_bt, y_old_bt, x_new_bt, y_new_bt, x_vals, y_vals, angle_old, moved, inward_cone, angle_vals):
+    """
+    Compute the angles of the printing head along a divided segment using the function compute_angle_radial. Every
+    sub-segment gets the angle of its start point. The angles are written into the array angle_vals.
+    :param x_old_bt: float
+        backtransformed x-coordinate of the start point
+    :param y_old_bt: float
+        backtransformed y-coordinate of the start point
+    :param x_new_bt: float
+        backtransformed x-coordinate of the end point
+    :param y_new_bt: float
+        backtransformed y-coordinate of the end point
+    :param x_vals: array
+        x-values of the points of the sub-segments
+    :param y_vals: array
+        y-values of the points of the sub-segments
+    :param angle_old: float
+        angle of the printing head before the segment
+    :param moved: bool
+        True, if the row changes the x- or y-value
+    :param inward_cone: bool
+        Boolean variable, which depends on the kind of transformation
+    :param angle_vals: array
+        array of the same length as x_vals, in which angle_old and the angle of every sub-segment are written
+    :return: float
+        angle_new, which is used after a reset of the U-values
+    """
+    angle_vals[0] = angle_old
+    for k in range(0, len(angle_vals) - 1):
+        angle_vals[k + 1] = compute_angle_radial(x_vals[k], y_vals[k], inward_cone)
+    return compute_angle_radial(x_old_bt, y_old_bt, inward_cone)
+
+
+def angles_tangential(x_old_bt, y_old_bt, x_new_bt, y_new_bt, x_vals, y_vals, angle_old, moved, inward_cone,
+                      angle_vals):
+    """
+    Compute the angles of the printing head along a divided segment using the function compute_angle_tangential. All
+    sub-segments get the same angle; if the row does not move in x or y, the old angle is kept.
+    (For the parameters and the return value see angles_radial.)
+    """
+    if moved:
+        angle_new = compute_angle_tangential(x_old_bt, y_old_bt, x_new_bt, y_new_bt, inward_cone)
+    else:
+        angle_new = angle_old
+    angle_vals[0] = angle_old
+    angle_vals[1:] = angle_new
+    return angle_new
 
-    return row_new
 
+# Functions computing the angles of the printing head, selected by the parameter angle_comp
+_ANGLE_FUNCTIONS = {'radial': angles_radial, 'tangential': angles_tangential}
 
-def backtransform_data_radial(data, cone_type, maximal_length):
+
+def backtransform_data(data, cone_type, maximal_length, angle_comp):
     """
     Backtransform G-Code, which is given in a list, each element describing a row. Rows which describe a movement
     are detected, x-, y-, z-, E- and U-values are replaced accordingly to the transformation. If a original segment
     is too long, it gets divided into sub-segments before the backtransformation. The U-values are computed
-    using the function compute_angle_radial. (Added, that while travel moves, nozzle only rises 1 mm above highest
-    printed point and not along cone.)
+    using the function compute_angle_radial or compute_angle_tangential. (Added, that while travel moves, nozzle only
+    rises 1 mm above highest printed point and not along cone.) The rows are read in batches, and the backtransformed
+    end points, lengths and numbers of sub-segments of all segments in a batch are computed at once.
     :param data: list
         List of strings, describing each line of the GCode, which is to be backtransformed
     :param cone_type: string
         String, either 'outward' or 'inward', defines which transformation should be used
     :param maximal_length: float
         Maximal length of a segment in the original GCode; every longer segment is divided, such that the resulting
-        segments are shorter than maximal_length
-    :return: list
-        List of strings, which describe the new GCode.
+        segments are not longer than maximal_length
+    :param angle_comp: string
+        String, which describes the way, the angle is computed; one of 'radial' or 'tangential'
+    :return: generator
+        Strings, which describe the new GCode. Every row is yielded as soon as it is computed, such that the
+        backtransformed GCode never has to be held in memory at once.
     """
-    new_data = []
-    pattern_X = r'X[-0-9]+[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]+[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]+[.]?[0-9]*'
-    pattern_E = r'E[-0-9]+[.]?[0-9]*'
-    pattern_G = r'\AG[01] '
 
-    x_old, y_old = 0, 0
     x_new, y_new = 0, 0
     z_layer = 0
     angle_old = 0
     z_max = 0
-    update_x, update_y = False, False
     if cone_type == 'outward':
         c = -1
         inward_cone = False
@@ -207,233 +449,249 @@ def backtransform_data_radial(data, cone_type, maximal_length):
         inward_cone = True
     else:
         raise ValueError('{} is not a admissible type for the transformation'.format(cone_type))
-
-    for row in data:
-
-        g_match = re.search(pattern_G, row)
-        if g_match is None:
-            new_data.append(row)
-
-        else:
-            x_match = re.search(pattern_X, row)
-            y_match = re.search(pattern_Y, row)
-            z_match = re.search(pattern_Z, row)
-            if x_match is None and y_match is None and z_match is None:
-                new_data.append(row)
+    if angle_comp not in _ANGLE_FUNCTIONS:
+        raise ValueError('{} is not a admissible type for the angle computation'.format(angle_comp))
+    compute_angles = _ANGLE_FUNCTIONS[angle_comp]
+    # radial: the U-value is set before the move to the sub-segment, tangential: after the move
+    u_before_move = angle_comp == 'radial'
+    # arrays for the values of the sub-segments, reused for all rows and only enlarged for very long segments
+    x_buffer, y_buffer, z_buffer, angle_buffer = (np.empty(_BUFFER_SIZE + 1) for k in range(4))
+    distance_buffer = np.empty(_BUFFER_SIZE)
+
+    data = iter(data)
+    while True:
+        batch = list(itertools.islice(data, _BATCH_SIZE))
+        if not batch:
+            break
+
+        # Read the movement rows of the batch; the segments start at the last point of the previous batch
+        movements = [None] * len(batch)
+        x_points, y_points = [x_new], [y_new]
+        for i, row in enumerate(batch):
+            if row.startswith(('G0 ', 'G1 ')):
+                fields = find_fields(row)
+                x_val, y_val, z_val, has_e = parse_movement(fields)
+                if x_val is not None or y_val is not None or z_val is not None:
+                    if z_val is not None:
+                        z_layer = z_val
+                    if x_val is not None:
+                        x_new = x_val
+                    if y_val is not None:
+                        y_new = y_val
+                    x_points.append(x_new)
+                    y_points.append(y_new)
+                    movements[i] = (z_layer, has_e, x_val is not None or y_val is not None, fields)
+        x_bt, y_bt, dists_transformed, nums_segm = segment_values(x_points, y_points, maximal_length)
+
+        k = 0
+        for row, movement in zip(batch, movements):
+
+            if movement is None:
+                yield row
 
             else:
-                if z_match is not None:
-                    z_layer = float(z_match.group(0).replace('Z', ''))
-                if x_match is not None:
-                    x_new = float(x_match.group(0).replace('X', ''))
-                    update_x = True
-                if y_match is not None:
-                    y_new = float(y_match.group(0).replace('Y', ''))
-                    update_y = True
-
-                # Compute new distance and angle according to new row
-                e_match = re.search(pattern_E, row)
-                x_old_bt, x_new_bt = x_old / np.sqrt(2), x_new / np.sqrt(2)
-                y_old_bt, y_new_bt = y_old / np.sqrt(2), y_new / np.sqrt(2)
-                dist_transformed = np.linalg.norm([x_new - x_old, y_new - y_old])
+                z_row, has_e, moved, fields = movement
+                x_old_bt, y_old_bt, x_new_bt, y_new_bt = x_bt[k], y_bt[k], x_bt[k + 1], y_bt[k + 1]
+                dist_transformed = dists_transformed[k]
+                num_segm = nums_segm[k]
+                k += 1
 
                 # Compute new values for backtransformation of row
-                num_segm = int(dist_transformed // maximal_length + 1)
-                x_vals = np.linspace(x_old_bt, x_new_bt, num_segm + 1)
-                y_vals = np.linspace(y_old_bt, y_new_bt, num_segm + 1)
-                if inward_cone and e_match is None and (update_x or update_y):
-                    z_start = z_layer + c * np.sqrt(x_old_bt ** 2 + y_old_bt ** 2)
-                    z_end = z_layer + c * np.sqrt(x_new_bt ** 2 + y_new_bt ** 2)
-                    z_vals = np.linspace(z_start, z_end, num_segm + 1)
+                linear_z = inward_cone and not has_e and moved
+                if num_segm > len(distance_buffer):
+                    x_buffer, y_buffer, z_buffer, angle_buffer = (np.empty(2 * num_segm + 1) for j in range(4))
+                    distance_buffer = np.empty(2 * num_segm)
+                angle_vals = angle_buffer[:num_segm + 1]
+                if num_segm == 1:
+                    x_vals, y_vals, z_vals, distances_bt, z_max = _compute_single_segment(
+                        x_old_bt, y_old_bt, x_new_bt, y_new_bt, z_row, c, linear_z, has_e, z_max)
                 else:
-                    z_vals = np.array([z_layer + c * np.sqrt(x ** 2 + y ** 2) for x, y in zip(x_vals, y_vals)])
-                    if e_match and (np.max(z_vals) > z_max or z_max == 0):
-                        z_max = np.max(z_vals)  # save hightes point with material extruded
-                    if e_match is None and np.max(z_vals) > z_max:
-                        np.minimum(z_vals, (z_max + 1),
-                                   z_vals)  # cut away all travel moves, that are higher than max height extruded + 1 mm safety
-                        # das hier könnte noch verschönert werden, in dem dann eine alle abgeschnittenen Werte mit einer einer geraden Linie ersetzt werden
-
-                angle_new = compute_angle_radial(x_old_bt, y_old_bt, inward_cone)
-
-                angle_vals = np.array(
-                    [angle_old] + [compute_angle_radial(x_vals[k], y_vals[k], inward_cone)
-                                   for k in range(0, num_segm)])
+                    x_vals, y_vals, z_vals = x_buffer[:num_segm + 1], y_buffer[:num_segm + 1], z_buffer[:num_segm + 1]
+                    distances_bt = distance_buffer[:num_segm]
+                    z_max = _compute_segment(x_old_bt, y_old_bt, x_new_bt, y_new_bt, z_row, c, num_segm, linear_z,
+                                             has_e, z_max, x_vals, y_vals, z_vals, distances_bt)
+                angle_new = compute_angles(x_old_bt, y_old_bt, x_new_bt, y_new_bt, x_vals, y_vals, angle_old, moved,
+                                           inward_cone, angle_vals)
                 u_vals = compute_U_values(angle_vals)
-                distances_transformed = dist_transformed / num_segm * np.ones(num_segm)
-                distances_bt = np.array(
-                    [np.linalg.norm([x_vals[i] - x_vals[i - 1], y_vals[i] - y_vals[i - 1], z_vals[i] - z_vals[i - 1]])
-                     for i in range(1, num_segm + 1)])
+                dist_segment = dist_transformed / num_segm
 
                 # Replace new row with num_seg new rows for movements and possible command rows for the U value
-                row = insert_Z(row, z_vals[0])
-                row = replace_E(row, num_segm, 1, 1 / np.sqrt(2))
-                replacement_rows = ''
+                row = insert_Z(row, f'Z{z_vals[0]:.3f}', fields)
+                if has_e:
+                    row = replace_E(row, num_segm, 1, _INV_SQRT2)
+                # the row is scanned once more, since insert_Z and replace_E have moved its values
+                template, template_u, e_val = movement_template(row, find_fields(row), has_e)
                 for j in range(0, num_segm):
-                    single_row = re.sub(pattern_X, 'X' + str(round(x_vals[j + 1], 3)), row)
-                    single_row = re.sub(pattern_Y, 'Y' + str(round(y_vals[j + 1], 3)), single_row)
-                    single_row = re.sub(pattern_Z, 'Z' + str(round(z_vals[j + 1], 3)), single_row)
-                    single_row = replace_E(single_row, distances_transformed[j], distances_bt[j], 1)
+                    # E-value as computed by replace_E
+                    if e_val is None or dist_segment == 0:
+                        e_new = 0
+                    else:
+                        e_new = e_val * distances_bt[j] / dist_segment
                     if np.abs(u_vals[j + 1] - u_vals[j]) <= 30:
-                        single_row = insert_U(single_row, u_vals[j + 1])
+                        yield template_u.format(x_vals[j + 1], y_vals[j + 1], z_vals[j + 1], e_new, u_vals[j + 1])
                     else:
-                        single_row = 'G1 E-0.800 \n' + 'G1 U' + str(u_vals[j + 1]) + ' \n' + 'G1 E0.800 \n' + single_row
-                    replacement_rows = replacement_rows + single_row
+                        single_row = template.format(x_vals[j + 1], y_vals[j + 1], z_vals[j + 1], e_new)
+                        if not u_before_move:
+                            yield single_row
+                        yield 'G1 E-0.800 \n'
+                        yield f'G1 U{u_vals[j + 1]:.2f} \n'
+                        yield 'G1 E0.800 \n'
+                        if u_before_move:
+                            yield single_row
                 if np.amax(np.absolute(u_vals)) > 3600:
-                    angle_reset = np.round(angle_vals[-1] * 360 / (2 * np.pi), 2)
-                    replacement_rows = replacement_rows + 'G92 U' + str(angle_reset) + '\n'
+                    angle_reset = angle_vals[-1] * _RAD2DEG
+                    yield f'G92 U{angle_reset:.2f}\n'
                     angle_old = angle_new
                 else:
-                    angle_old = u_vals[-1] * 2 * np.pi / 360
-                row = replacement_rows
+                    angle_old = u_vals[-1] / _RAD2DEG
 
-                if update_x:
-                    x_old = x_new
-                    update_x = False
-                if update_y:
-                    y_old = y_new
-                    update_y = False
-                new_data.append(row)
 
-    return new_data
+def find_fields(row):
+    """
+    Find the X-, Y-, Z-, E- and U-values of a row with a single scan of the row.
+    :param row: string
+        String containing the row
+    :return: dict
+        Dictionary, which maps the letters of the parameters to the match of their first occurrence in the row
+    """
+    fields = {}
+    for match in _RE_FIELDS.finditer(row):
+        if match.lastgroup not in fields:
+            fields[match.lastgroup] = match
+    return fields
 
 
-def backtransform_data_tangential(data, cone_type, maximal_length):
+def replace_fields(row, replacements):
     """
-   Backtransform GCode, which is given in a list, each element describing a row. Rows which describe a movement
-    are detected, x-, y-, z-, e- and U-values are replaced accordingly to the transformation. If a original segment
-    is too long, it gets divided into sub-segments before the backtransformation. The U-values are computed
-    using the function compute_angle_tangential.
-    :param data: list
-        List of strings, describing each line of the GCode, which is to be backtransformed
-    :param cone_type: string
-        String, either 'outward' or 'inward', defines which transformation should be used
-    :param maximal_length: float
-        Maximal length of a segment in the original GCode; every longer segment is divided, such that the resulting
-        segments are shorter than maximal_length
-    :return: list
-        List of strings, which describe the new GCode.
+    Replace parameters in a row by new strings. The row is not searched again; the new row is spliced together from
+    the spans of the given matches.
+    :param row: string
+        String containing the row
+    :param replacements: list
+        List of tuples (match, string), where the match of a parameter in row is replaced by the string
+    :return: string
+        New string, containing the row with replaced parameters
     """
-    new_data = []
-    pattern_X = r'X[-0-9]+[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]+[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]+[.]?[0-9]*'
-    pattern_E = r'E[-0-9]+[.]?[0-9]*'
-    pattern_G = r'\AG[01] '
+    row_parts = []
+    position = 0
+    for match, new_string in sorted(replacements, key=lambda replacement: replacement[0].start(0)):
+        row_parts.append(row[position:match.start(0)])
+        row_parts.append(new_string)
+        position = match.end(0)
+    row_parts.append(row[position:])
+    return ''.join(row_parts)
 
-    x_old, y_old = 0, 0
-    x_new, y_new = 0, 0
-    z_layer = 0
-    angle_old = 0
-    z_max = 0
 
-    update_x, update_y = False, False
-    if cone_type == 'outward':
-        c = -1
-        inward_cone = False
-    elif cone_type == 'inward':
-        c = 1
-        inward_cone = True
-    else:
-        raise ValueError('{} is not a admissible type for the transformation'.format(cone_type))
+def read_U(row, u_val):
+    """
+    Read the U-value of a row, which describes the orientation of the printing head.
+    :param row: string
+        String containing the row
+    :param u_val: float
+        Orientation of the printing head before the row in radian
+    :return: float
+        Orientation of the printing head after the row in radian; u_val, if the row contains no U-value
+    """
+    # also rows like 'G92 U...' reset the orientation, so the U-value is read from every row containing a U
+    if 'U' in row:
+        u_match = _RE_U.search(row)
+        if u_match is not None:
+            u_val = math.radians(float(u_match.group(0)[1:]))
+    return u_val
 
-    for row in data:
 
-        g_match = re.search(pattern_G, row)
-        if g_match is None:
-            new_data.append(row)
+def translate_rows(data, u_val, translate_x, translate_y, z_translate, z_desired, e_parallel, e_perpendicular):
+    """
+    Translate the rows of GCode, starting with the orientation u_val of the printing head. The rows are translated
+    independently of each other, apart from the orientation, which is given by the last U-value. All rows are read
+    first, then the new x-, y- and z-values of all movement rows are computed at once with NumPy.
+    :param data: list
+        List of strings, containing the GCode
+    :param u_val: float
+        Orientation of the printing head before the first row in radian
+    :param translate_x: float
+        Float, which describes the translation in x-direction
+    :param translate_y: float
+        Float, which describes the translation in y-direction
+    :param z_translate: float
+        Float, which describes the translation in z-direction
+    :param z_desired: float
+        Desired minimal z-value
+    :param e_parallel: float
+        Correction of extrusion error parallel to nozzle
+    :param e_perpendicular: float
+        Correction of extrusion error perpendicular to nozzle
+    :return: generator
+        Strings, which contain the translated GCode, row by row
+    """
+    # matches of the x-, y- and z-value of every movement row (None for the other rows), missing values are nan
+    movements = [None] * len(data)
+    x_vals, y_vals, z_vals, cos_vals, sin_vals = [], [], [], [], []
+    # the orientation only changes in rows with a U-value, so cos and sin are computed only then
+    cos_u, sin_u = math.cos(u_val), math.sin(u_val)
+    for i, row in enumerate(data):
+
+        u_new = read_U(row, u_val)
+        if u_new != u_val:
+            u_val = u_new
+            cos_u, sin_u = math.cos(u_val), math.sin(u_val)
+
+        if row.startswith(('G0 ', 'G1 ')):
+            fields = find_fields(row)
+            x_match = fields.get('X')
+            y_match = fields.get('Y')
+            z_match = fields.get('Z')
+            movements[i] = (x_match, y_match, z_match)
+            x_vals.append(math.nan if x_match is None else float(x_match.group(0)[1:]))
+            y_vals.append(math.nan if y_match is None else float(y_match.group(0)[1:]))
+            z_vals.append(math.nan if z_match is None else float(z_match.group(0)[1:]))
+            cos_vals.append(cos_u)
+            sin_vals.append(sin_u)
+
+    cos_u = np.array(cos_vals)
+    sin_u = np.array(sin_vals)
+    # added correction for misalignment of nozzle
+    x_vals = (np.array(x_vals) + translate_x - e_parallel * cos_u + e_perpendicular * sin_u).tolist()
+    y_vals = (np.array(y_vals) + translate_y - e_parallel * sin_u - e_perpendicular * cos_u).tolist()
+    z_vals = np.maximum(np.array(z_vals) + z_translate, z_desired).tolist()
+
+    k = 0
+    for row, movement in zip(data, movements):
+
+        if movement is None:
+            yield row
 
         else:
-            x_match = re.search(pattern_X, row)
-            y_match = re.search(pattern_Y, row)
-            z_match = re.search(pattern_Z, row)
-
-            if x_match is None and y_match is None and z_match is None:
-                new_data.append(row)
-
-            else:
-                if z_match is not None:
-                    z_layer = float(z_match.group(0).replace('Z', ''))
-                if x_match is not None:
-                    x_new = float(x_match.group(0).replace('X', ''))
-                    update_x = True
-                if y_match is not None:
-                    y_new = float(y_match.group(0).replace('Y', ''))
-                    update_y = True
-
-                # Compute new values according to new row
-                e_match = re.search(pattern_E, row)
-                x_old_bt, y_old_bt = x_old / np.sqrt(2), y_old / np.sqrt(2)
-                x_new_bt, y_new_bt = x_new / np.sqrt(2), y_new / np.sqrt(2)
-                dist_transformed = np.linalg.norm([x_new - x_old, y_new - y_old])
-                if update_x or update_y:
-                    angle_new = compute_angle_tangential(x_old_bt, y_old_bt, x_new_bt, y_new_bt, inward_cone)
-                else:
-                    angle_new = angle_old
-
-                # Compute new values for backtransformation of row
-                num_segm = int(dist_transformed // maximal_length + 1)
-                x_vals = np.linspace(x_old_bt, x_new_bt, num_segm + 1)
-                y_vals = np.linspace(y_old_bt, y_new_bt, num_segm + 1)
-                if inward_cone and e_match is None and (update_x or update_y):
-                    z_start = z_layer + c * np.sqrt(x_old_bt ** 2 + y_old_bt ** 2)
-                    z_end = z_layer + c * np.sqrt(x_new_bt ** 2 + y_new_bt ** 2)
-                    z_vals = np.linspace(z_start, z_end, num_segm + 1)
-                else:
-                    z_vals = np.array([z_layer + c * np.sqrt(x ** 2 + y ** 2) for x, y in zip(x_vals, y_vals)])
-                    if e_match and (np.max(z_vals) > z_max or z_max == 0):
-                        z_max = np.max(z_vals)  # save hightes point with material extruded
-                    if e_match is None and np.max(z_vals) > z_max:
-                        np.minimum(z_vals, (z_max + 1),
-                                   z_vals)  # cut away all travel moves, that are higher than max height extruded + 1 mm safety
-                        # das hier könnte noch verschönert werden, in dem dann alle abgeschnittenen Werte mit einer einer geraden Linie ersetzt werden
-                angle_vals = np.array([angle_old] + [angle_new for k in range(0, num_segm)])
-                u_vals = compute_U_values(angle_vals)
-                distances_transformed = dist_transformed / num_segm * np.ones(num_segm)
-                distances_bt = np.array(
-                    [np.linalg.norm([x_vals[i] - x_vals[i - 1], y_vals[i] - y_vals[i - 1], z_vals[i] - z_vals[i - 1]])
-                     for i in range(1, num_segm + 1)])
-
-                # Replace new row with num_seg new rows for movements and possible command rows for the U value
-                row = insert_Z(row, z_vals[0])
-                row = replace_E(row, num_segm, 1, 1 / np.sqrt(2))
-                replacement_rows = ''
-                for j in range(0, num_segm):
-                    single_row = re.sub(pattern_X, 'X' + str(round(x_vals[j + 1], 3)), row)
-                    single_row = re.sub(pattern_Y, 'Y' + str(round(y_vals[j + 1], 3)), single_row)
-                    single_row = re.sub(pattern_Z, 'Z' + str(round(z_vals[j + 1], 3)), single_row)
-                    single_row = replace_E(single_row, distances_transformed[j], distances_bt[j], 1)
-                    if np.abs(u_vals[j + 1] - u_vals[j]) <= 30:
-                        single_row = insert_U(single_row, u_vals[j + 1])
-                    else:
-                        single_row = single_row + 'G1 E-0.800 \n' + 'G1 U' + str(u_vals[j + 1]) + ' \n' + 'G1 E0.800 \n'
-                    replacement_rows = replacement_rows + single_row
-                if np.amax(np.absolute(u_vals)) > 3600:
-                    angle_reset = np.round(angle_vals[-1] * 360 / (2 * np.pi), 2)
-                    replacement_rows = replacement_rows + 'G92 U' + str(angle_reset) + '\n'
-                    angle_old = angle_new
-                else:
-                    angle_old = u_vals[-1] * 2 * np.pi / 360
+            x_match, y_match, z_match = movement
+            replacements = []
+            if x_match is not None:
+                replacements.append((x_match, f'X{x_vals[k]:.3f}'))
+            if y_match is not None:
+                replacements.append((y_match, f'Y{y_vals[k]:.3f}'))
+            if z_match is not None:
+                replacements.append((z_match, f'Z{z_vals[k]:.3f}'))
+            k += 1
 
-                row = replacement_rows
+            yield replace_fields(row, replacements)
 
-                if update_x:
-                    x_old = x_new
-                    update_x = False
-                if update_y:
-                    y_old = y_new
-                    update_y = False
-                new_data.append(row)
 
-    return new_data
+def _translate_chunk(args):
+    """
+    Translate a chunk of rows in a worker process, args are the arguments of translate_rows.
+    :return: list
+        List of strings, which contain the translated rows of the chunk
+    """
+    return list(translate_rows(*args))
 
 
-def translate_data(data, translate_x, translate_y, z_desired, e_parallel, e_perpendicular):
+def translate_data(data, translate_x, translate_y, z_desired, e_parallel, e_perpendicular, processes=1):
     """
     Translate the GCode in x- and y-direction. Only the lines, which describe a movement will be translated.
     Additionally, if z_translation is True, the z-values will be translated such that the minimal z-value is z_desired.
     This happens by traversing the list of strings twice. If cone_type is 'inward', it is assured, that all moves
-    with no extrusion have at least a height of z_desired.
+    with no extrusion have at least a height of z_desired. If more than one process is used, the second traversal is
+    split into chunks of rows, which are translated in parallel; the orientation at the start of every chunk is read
+    beforehand.
     :param data: list
         List of strings, containing the GCode
     :param translate_x: float
@@ -446,25 +704,21 @@ def translate_data(data, translate_x, translate_y, z_desired, e_parallel, e_perp
         Correction of extrusion error parallel to nozzle
     :param e_perpendicular: float
         Correction of extrusion error perpendicular to nozzle
-    :return: list
-        List of strings, which contains the translated GCode
-    """
-    new_data = []
-    pattern_X = r'X[-0-9]+[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]+[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]+[.]?[0-9]*'
-    pattern_E = r'E[-0-9]+[.]?[0-9]*'
-    pattern_U = r'U[-0-9]+[.]?[0-9]*'
-    pattern_G = r'\AG[01] '
+    :param processes: int
+        Number of processes used for the translation
+    :return: generator
+        Strings, which contain the translated GCode, row by row
+    """
     z_initialized = False
-    u_val = 0.0
 
     for row in data:
-        g_match = re.search(pattern_G, row)
-        z_match = re.search(pattern_Z, row)
-        e_match = re.search(pattern_E, row)
-        if g_match is not None and z_match is not None and e_match is not None:
-            z_val = float(z_match.group(0).replace('Z', ''))
+        if not row.startswith(('G0 ', 'G1 ')):
+            continue
+        fields = find_fields(row)
+        z_match = fields.get('Z')
+        e_match = fields.get('E')
+        if z_match is not None and e_match is not None:
+            z_val = float(z_match.group(0)[1:])
             if not z_initialized:
                 z_min = z_val
                 z_initialized = True
@@ -472,40 +726,26 @@ def translate_data(data, translate_x, translate_y, z_desired, e_parallel, e_perp
                 z_min = z_val
     z_translate = z_desired - z_min
 
-    for row in data:
-
-        x_match = re.search(pattern_X, row)
-        y_match = re.search(pattern_Y, row)
-        z_match = re.search(pattern_Z, row)
-        g_match = re.search(pattern_G, row)
-        u_match = re.search(pattern_U, row)
-
-        if u_match is not None:
-            u_val = np.radians(float(u_match.group(0).replace('U', '')))
-
-        if g_match is None:
-            new_data.append(row)
-
-        else:
-            if x_match is not None:
-                x_val = round(float(x_match.group(0).replace('X', '')) + translate_x - (e_parallel * np.cos(u_val)) + (
-                        e_perpendicular * np.sin(u_val)), 3)  # added correction for misalignment of nozzle
-                row = re.sub(pattern_X, 'X' + str(x_val), row)
-            if y_match is not None:
-                y_val = round(float(y_match.group(0).replace('Y', '')) + translate_y - (e_parallel * np.sin(u_val)) - (
-                        e_perpendicular * np.cos(u_val)), 3)  # added correction for misalignment of nozzle
-                row = re.sub(pattern_Y, 'Y' + str(y_val), row)
-            if z_match is not None:
-                z_val = max(round(float(z_match.group(0).replace('Z', '')) + z_translate, 3), z_desired)
-                row = re.sub(pattern_Z, 'Z' + str(z_val), row)
-
-            new_data.append(row)
+    if processes <= 1:
+        yield from translate_rows(data, 0.0, translate_x, translate_y, z_translate, z_desired, e_parallel,
+                                  e_perpendicular)
+        return
 
-    return new_data
+    chunk_size = max(1, math.ceil(len(data) / (4 * processes)))
+    chunks = []
+    u_val = 0.0
+    for chunk_start in range(0, len(data), chunk_size):
+        chunk = data[chunk_start:chunk_start + chunk_size]
+        chunks.append((chunk, u_val, translate_x, translate_y, z_translate, z_desired, e_parallel, e_perpendicular))
+        for row in chunk:
+            u_val = read_U(row, u_val)
+    with multiprocessing.Pool(processes) as pool:
+        for rows in pool.imap(_translate_chunk, chunks):
+            yield from rows
 
 
 def backtransform_file(path, output_dir, cone_type, maximal_length, angle_comp, x_shift, y_shift, z_desired, e_parallel,
-                       e_perpendicular):
+                       e_perpendicular, processes=1):
     """
     Read GCode from file, backtransform, translate it and save backtransformed G-Code.
     :param path: string
@@ -528,23 +768,17 @@ def backtransform_file(path, output_dir, cone_type, maximal_length, angle_comp,
         Correction of extrusion error parallel to nozzle
     :param e_parallel: float
         Correction of extrusion error perpendicular to nozzle
+    :param processes: int
+        Number of processes used for the translation of the backtransformed GCode
     :return: None
     """
     start = time.time()
-    if angle_comp == 'radial':
-        backtransform_data = backtransform_data_radial
-    elif angle_comp == 'tangential':
-        backtransform_data = backtransform_data_tangential
-    else:
-        raise ValueError('{} is not a admissible type for the angle computation'.format(angle_comp))
 
+    # the input is streamed through the backtransformation; only its result is kept, since translate_data needs two
+    # passes over the data
     with open(path, 'r') as f_gcode:
-        data = f_gcode.readlines()
-    data_bt = backtransform_data(data, cone_type, maximal_length)
-    data_bt_string = ''.join(data_bt)
-    data_bt = [row + ' \n' for row in data_bt_string.split('\n')]
-    data_bt = translate_data(data_bt, x_shift, y_shift, z_desired, e_parallel, e_perpendicular)
-    data_bt_string = ''.join(data_bt)
+        data_bt = [row.rstrip('\n') + ' \n'
+                   for row in backtransform_data(f_gcode, cone_type, maximal_length, angle_comp)]
 
     if not os.path.exists(output_dir):
         os.mkdir(output_dir)
@@ -552,7 +786,8 @@ def backtransform_file(path, output_dir, cone_type, maximal_length, angle_comp,
     file_name = file_name.replace('.gcode', '_bt_' + cone_type + '_' + angle_comp + '.gcode')
     output_path = output_dir + file_name
     with open(output_path, 'w+') as f_gcode_bt:
-        f_gcode_bt.write(data_bt_string)
+        f_gcode_bt.writelines(translate_data(data_bt, x_shift, y_shift, z_desired, e_parallel, e_perpendicular,
+                                                  processes))
 
     end = time.time()
     print('GCode generated in {:.1f}s, saved in {}'.format(end - start, output_path))
@@ -574,16 +809,19 @@ delta_y = 0  # shift of code in y-direction
 z_height = 0.1  # desired height in z-direction
 err_parallel = 0.25   # error in parallel direction
 err_perpendicular = 0.65  # error in perpendicular direction
-
-# G-Code backtransformation function call
-backtransform_file(path=file_path,
-                   output_dir=dir_backtransformed,
-                   cone_type=transformation_type,
-                   maximal_length=max_length,
-                   angle_comp=angle_type,
-                   x_shift=delta_x,
-                   y_shift=delta_y,
-                   z_desired=z_height,
-                   e_parallel=err_parallel,
-                   e_perpendicular=err_perpendicular
-                   )
+n_processes = 1  # number of processes used for the translation
+
+# G-Code backtransformation function call (guarded, since worker processes may import this file)
+if __name__ == '__main__':
+    backtransform_file(path=file_path,
+                       output_dir=dir_backtransformed,
+                       cone_type=transformation_type,
+                       maximal_length=max_length,
+                       angle_comp=angle_type,
+                       x_shift=delta_x,
+                       y_shift=delta_y,
+                       z_desired=z_height,
+                       e_parallel=err_parallel,
+                       e_perpendicular=err_perpendicular,
+                       processes=n_processes
+                       )
@@ -1,7 +1,15 @@
+import math
+import multiprocessing
 import re
 import numpy as np
 import time
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional, without it the kernel runs as plain Python function
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 # -----------------------------------------------------------------------------------------
 # Transformation Settings
 # -----------------------------------------------------------------------------------------
@@ -12,34 +20,77 @@ CONE_TYPE = 'outward'                                # type of the cone: 'inward
 FIRST_LAYER_HEIGHT = 0.2                            # moves all the gcode up to this height. Use also for stacking
 X_SHIFT = 110                                       # moves your gcode away from the origin into the center of the bed (usually bed size / 2)
 Y_SHIFT = 90
+PROCESSES = 1                                       # number of processes used for the backtransformation
+
+# Patterns of the G-Code parameters, compiled once and shared by all functions
+_RE_E = re.compile(r'E[-0-9]*[.]?[0-9]*')
+# All parameters in one pattern, such that a row is scanned only once; the group name is the letter of the parameter
+_RE_FIELDS = re.compile(r'(?P<X>X[-0-9]*[.]?[0-9]*)|(?P<Y>Y[-0-9]*[.]?[0-9]*)|(?P<Z>Z[-0-9]*[.]?[0-9]*)|'
+                        r'(?P<E>E[-0-9]*[.]?[0-9]*)|(?P<U>U[-0-9]*[.]?[0-9]*)')
 
 
-def insert_Z(row, z_value):
+def find_fields(row):
     """
-    Insert or replace the z-value in a row. The new z-value must be given.
+    Find the X-, Y-, Z-, E- and U-values of a row with a single scan of the row.
+    :param row: string
+        String containing the row
+    :return: dict
+        Dictionary, which maps the letters of the parameters to the match of their first occurrence in the row
+    """
+    fields = {}
+    for match in _RE_FIELDS.finditer(row):
+        if match.lastgroup not in fields:
+            fields[match.lastgroup] = match
+    return fields
+
+
+def replace_fields(row, replacements):
+    """
+    Replace parameters in a row by new strings. The row is not searched again; the new row is spliced together from
+    the spans of the given matches.
+    :param row: string
+        String containing the row
+    :param replacements: list
+        List of tuples (match, string), where the match of a parameter in row is replaced by the string
+    :return: string
+        New string, containing the row with replaced parameters
+    """
+    row_parts = []
+    position = 0
+    for match, new_string in sorted(replacements, key=lambda replacement: replacement[0].start(0)):
+        row_parts.append(row[position:match.start(0)])
+        row_parts.append(new_string)
+        position = match.end(0)
+    row_parts.append(row[position:])
+    return ''.join(row_parts)
+
+
+def insert_Z(row, z_string, fields):
+    """
+    Insert or replace the z-value in a row. The new z-value must be given as formatted string; the row is not searched
+    again, the positions of its parameters are taken from fields.
     :param row: string
         String containing the row, in which a z-value has to be inserted or replaced
-    :param z_value: float
-        New z-value, which should be inserted
+    :param z_string: string
+        New z-value including the letter, e.g. 'Z1.000', which should be inserted
+    :param fields: dict
+        Matches of the parameters of the row, as returned by find_fields
     :return: string
         New string, containing the row with replaced z-value
     """
-    pattern_X = r'X[-0-9]*[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]*[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]*[.]?[0-9]*'
-    match_x = re.search(pattern_X, row)
-    match_y = re.search(pattern_Y, row)
-    match_z = re.search(pattern_Z, row)
+    match_z = fields.get('Z')
+    match_y = fields.get('Y')
+    match_x = fields.get('X')
 
     if match_z is not None:
-        row_new = re.sub(pattern_Z, ' Z' + str(round(z_value, 3)), row)
+        row_new = row[0:match_z.start(0)] + ' ' + z_string + row[match_z.end(0):]
     else:
         if match_y is not None:
-            row_new = row[0:match_y.end(0)] + ' Z' + str(round(z_value, 3)) + row[match_y.end(0):]
+            row_new = row[0:match_y.end(0)] + ' ' + z_string + row[match_y.end(0):]
         elif match_x is not None:
-            row_new = row[0:match_x.end(0)] + ' Z' + str(round(z_value, 3)) + row[match_x.end(0):]
+            row_new = row[0:match_x.end(0)] + ' ' + z_string + row[match_x.end(0):]
         else:
-            row_new = 'Z' + str(round(z_value, 3)) + ' ' + row
+            row_new = z_string + ' ' + row
     return row_new
 
 
@@ -59,102 +110,120 @@ def replace_E(row, dist_old, dist_new, corr_value):
     :return: string
         New string, containing the row with replaced extruder value
     """
-    pattern_E = r'E[-0-9]*[.]?[0-9]*'
-    match_e = re.search(pattern_E, row)
+    match_e = _RE_E.search(row)
     if match_e is None:
         return row
-    e_val_old = float(match_e.group(0).replace('E', ''))
+    e_val_old = float(match_e.group(0)[1:])
     if dist_old == 0:
         e_val_new = 0
     else:
         e_val_new = e_val_old * dist_new * corr_value / dist_old
-    e_str_new = 'E' + f'{e_val_new:.5f}'
-    row_new = row[0:match_e.start(0)] + e_str_new + row[match_e.end(0):]
+    row_new = f'{row[:match_e.start(0)]}E{e_val_new:.5f}{row[match_e.end(0):]}'
     return row_new
 
 
-def compute_angle_radial(x_old, y_old, x_new, y_new, inward_cone):
+def parse_movement(row):
     """
-    Compute the angle of the printing head, when moving from an old point [x_old, y_old] to a new point [x_new, y_new].
-    (Note: the z-value is not considered for the orientation of the printing head.) The direction is given by the
-    direction of the new point by the arctan2 value according to the coordinates.
-    :param x_old: float
-        x-coordinate of the old point
-    :param y_old: float
-        y-coordinate of the old point
-    :param x_new: float
-        x-coordinate of the new point
-    :param y_new: float
-        y-coordinate of the new point
-    :param inward_cone: bool
-        Boolean variable, which depends on the kind of transformation. If True, an additional angle of pi is added to
-        the angle.
-    :return: float
-        Angle, which describes orientation of printing head. Its value lies in [-pi, pi].
-    """
-    angle = np.arctan2(y_new, x_new)
-    if inward_cone:
-        angle = angle + np.pi
-    return angle
-
-
-
-
-
-def compute_U_values(angle_array):
-    """
-    Compute the U-values, which will be inserted, according to given angle values.
-    The U-values are computed such that there are no discontinuous jumps from pi to -pi.
-    :param angle_array: array
-        Array, which contains the angle values in radian
-    :return array
-        Array, which contains U-values in degrees
+    Read the x-, y- and z-values of a movement row and check, if material is extruded. The row is split into its
+    words once and every word is dispatched by its first letter; comments after a ';' are ignored.
+    :param row: string
+        String containing a G1 row
+    :return: tuple
+        x-, y- and z-value of the row (None, if not given) and a bool, which is True if the row contains an E-value
     """
-    # angle_candidates = np.around(np.array([angle_array, angle_array - 2 * np.pi, angle_array + 2 * np.pi]).T, 4)
-    angle_candidates = np.around(np.array([angle_array + k * 2 * np.pi for k in range(-10, 11)]).T, 4)
-    angle_insert = [angle_array[0]]
-    for i in range(1, len(angle_array)):
-        angle_prev = angle_insert[i - 1]
-        idx = np.argmin(np.absolute(angle_candidates[i] - angle_prev))
-        angle_insert.append(angle_candidates[i, idx])
-
-    angle_insert = np.round(np.array(angle_insert) * 360 / (2 * np.pi), 2)
-
-    return angle_insert
-
-
-def insert_U(row, angle):
+    x_val, y_val, z_val = None, None, None
+    has_e = False
+    for word in row.split(';', 1)[0].split():
+        letter = word[0]
+        if letter == 'X':
+            x_val = float(word[1:])
+        elif letter == 'Y':
+            y_val = float(word[1:])
+        elif letter == 'Z':
+            z_val = float(word[1:])
+        elif letter == 'E':
+            has_e = True
+    return x_val, y_val, z_val, has_e
+
+
+@njit(fastmath=True, cache=True)
+def _compute_segment(x_start, y_start, x_end, y_end, z_layer, c, tan_angle, num_segm, linear_z, has_e, z_max):
     """
-    Insert or replace the U-value in a row, where the U-values describes the orientation of the printing head.
-    :param row: string
-        String containing the row, in which a U-value has to be inserted or replaced
-    :param angle: float
-        Value of the angle, which is inserted or replaces the old U-value
-    :return: string
-        New string, containing the row with replaced U-value
+    Compute the backtransformed points of a segment, which is divided into num_segm sub-segments, and the lengths of the
+    sub-segments. Only scalar arithmetic is used, such that the function can be compiled with numba.
+    :param x_start: float
+        backtransformed x-coordinate of the start point
+    :param y_start: float
+        backtransformed y-coordinate of the start point
+    :param x_end: float
+        backtransformed x-coordinate of the end point
+    :param y_end: float
+        backtransformed y-coordinate of the end point
+    :param z_layer: float
+        z-value of the layer in the transformed GCode
+    :param c: int
+        sign of the cone, -1 for 'outward' and 1 for 'inward'
+    :param tan_angle: float
+        tangent of the cone angle
+    :param num_segm: int
+        number of sub-segments
+    :param linear_z: bool
+        If True, the z-values are interpolated linearly between start and end point instead of following the cone
+        (travel moves of the inward cone)
+    :param has_e: bool
+        True, if material is extruded along the segment
+    :param z_max: float
+        highest point with material extruded so far
+    :return: tuple
+        arrays x_vals, y_vals, z_vals of length num_segm + 1, array distances_bt of length num_segm and the updated z_max
     """
-    pattern_Z = r'Z[-0-9]*[.]?[0-9]*'
-    match_z = re.search(pattern_Z, row)
-    pattern_U = r'U[-0-9]*[.]?[0-9]*'
-    match_u = re.search(pattern_U, row)
-
-    if match_u is None:
-        row_new = row[0:match_z.end(0)] + ' U' + str(angle) + row[match_z.end(0):]
+    x_vals = np.empty(num_segm + 1)
+    y_vals = np.empty(num_segm + 1)
+    z_vals = np.empty(num_segm + 1)
+    distances_bt = np.empty(num_segm)
+    for k in range(num_segm):
+        x_vals[k] = x_start + k * ((x_end - x_start) / num_segm)
+        y_vals[k] = y_start + k * ((y_end - y_start) / num_segm)
+    x_vals[num_segm] = x_end
+    y_vals[num_segm] = y_end
+    if linear_z:
+        z_start = z_layer + c * math.hypot(x_start, y_start) * tan_angle
+        z_end = z_layer + c * math.hypot(x_end, y_end) * tan_angle
+        for k in range(num_segm):
+            z_vals[k] = z_start + k * ((z_end - z_start) / num_segm)
+        z_vals[num_segm] = z_end
     else:
-        row_new = re.sub(pattern_U, 'U' + str(angle), row)
-
-    return row_new
-
-
-def backtransform_data_radial(data, cone_type, maximal_length, cone_angle_rad):
+        for k in range(num_segm + 1):
+            z_vals[k] = z_layer + c * math.hypot(x_vals[k], y_vals[k]) * tan_angle
+        # seeded with the first value, fastmath lets numba assume that no infinities occur
+        z_highest = z_vals[0]
+        for k in range(1, num_segm + 1):
+            z_highest = max(z_highest, z_vals[k])
+        if has_e and (z_highest > z_max or z_max == 0):
+            z_max = z_highest  # save hightes point with material extruded
+        if not has_e and z_highest > z_max:
+            # cut away all travel moves, that are higher than max height extruded + 1 mm safety
+            for k in range(num_segm + 1):
+                z_vals[k] = min(z_vals[k], z_max + 1)
+            # das hier könnte noch verschönert werden, in dem dann eine alle abgeschnittenen Werte mit einer einer geraden Linie ersetzt werden
+    for k in range(num_segm):
+        dx = x_vals[k + 1] - x_vals[k]
+        dy = y_vals[k + 1] - y_vals[k]
+        dz = z_vals[k + 1] - z_vals[k]
+        distances_bt[k] = math.sqrt(dx * dx + dy * dy + dz * dz)
+    return x_vals, y_vals, z_vals, distances_bt, z_max
+
+
+def backtransform_rows_radial(data, state, cone_type, maximal_length, cone_angle_rad):
     """
     Backtransform GCode, which is given in a list, each element describing a row. Rows which describe a movement
     are detected, x-, y-, z-, E- and U-values are replaced accordingly to the transformation. If a original segment
-    is too long, it gets divided into sub-segments before the backtransformation. The U-values are computed
-    using the funciton compute_angle_radial.(wuem: added, that while travel moves, nozzle only rises 1 mm above highest
-    printed point and not along cone)
+    is too long, it gets divided into sub-segments before the backtransformation. (wuem: added, that while travel
+    moves, nozzle only rises 1 mm above highest printed point and not along cone)
     :param data: list
         List of strings, describing each line of the GCode, which is to be backtransformed
+    :param state: tuple
+        State of the backtransformation before the first row, as returned by backtransform_state
     :param cone_type: string
         String, either 'outward' or 'inward', defines which transformation should be used
     :param maximal_length: float
@@ -162,20 +231,12 @@ def backtransform_data_radial(data, cone_type, maximal_length, cone_angle_rad):
         segments are shorter than maximal_length
     : param cone_angle_rad
         Angle of transformation cone in rad
-    :return: list
-        List of strings, which describe the new GCode.
+    :return: generator
+        Strings, which describe the new GCode. Every row is yielded as soon as it is computed.
     """
-    new_data = []
-    pattern_X = r'X[-0-9]*[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]*[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]*[.]?[0-9]*'
-    pattern_E = r'E[-0-9]*[.]?[0-9]*'
-    pattern_G = r'\AG[1] '
-
-    x_old, y_old = 0, 0
-    x_new, y_new = 0, 0
-    z_layer = 0
-    z_max = 0
+
+    x_old, y_old, z_layer, z_max = state
+    x_new, y_new = x_old, y_old
     update_x, update_y = False, False
     if cone_type == 'outward':
         c = -1
@@ -185,69 +246,57 @@ def backtransform_data_radial(data, cone_type, maximal_length, cone_angle_rad):
         inward_cone = True
     else:
         raise ValueError('{} is not a admissible type for the transformation'.format(cone_type))
+    cos_angle = math.cos(cone_angle_rad)
+    tan_angle = math.tan(cone_angle_rad)
 
     for row in data:
 
-        g_match = re.search(pattern_G, row)
-        if g_match is None:
-            new_data.append(row)
+        if not row.startswith('G1 '):
+            yield row
 
         else:
-            x_match = re.search(pattern_X, row)
-            y_match = re.search(pattern_Y, row)
-            z_match = re.search(pattern_Z, row)
+            x_val, y_val, z_val, has_e = parse_movement(row)
 
-            if x_match is None and y_match is None and z_match is None:
-                new_data.append(row)
+            if x_val is None and y_val is None and z_val is None:
+                yield row
 
             else:
-                if z_match is not None:
-                    z_layer = float(z_match.group(0).replace('Z', ''))
-                if x_match is not None:
-                    x_new = float(x_match.group(0).replace('X', ''))
+                if z_val is not None:
+                    z_layer = z_val
+                if x_val is not None:
+                    x_new = x_val
                     update_x = True
-                if y_match is not None:
-                    y_new = float(y_match.group(0).replace('Y', ''))
+                if y_val is not None:
+                    y_new = y_val
                     update_y = True
 
                 # Compute new distance and angle according to new row
-                e_match = re.search(pattern_E, row)
-                x_old_bt, x_new_bt = x_old * np.cos(cone_angle_rad), x_new * np.cos(cone_angle_rad)
-                y_old_bt, y_new_bt = y_old * np.cos(cone_angle_rad), y_new * np.cos(cone_angle_rad)
-                dist_transformed = np.linalg.norm([x_new - x_old, y_new - y_old])
+                x_old_bt, x_new_bt = x_old * cos_angle, x_new * cos_angle
+                y_old_bt, y_new_bt = y_old * cos_angle, y_new * cos_angle
+                dist_transformed = math.hypot(x_new - x_old, y_new - y_old)
 
                 # Compute new values for backtransformation of row
                 num_segm = int(dist_transformed // maximal_length + 1)
-                x_vals = np.linspace(x_old_bt, x_new_bt, num_segm + 1)
-                y_vals = np.linspace(y_old_bt, y_new_bt, num_segm + 1)
-                if inward_cone and e_match is None and (update_x or update_y):
-                    z_start = z_layer + c * np.sqrt(x_old_bt ** 2 + y_old_bt ** 2) * np.tan(cone_angle_rad)
-                    z_end = z_layer + c * np.sqrt(x_new_bt ** 2 + y_new_bt ** 2) * np.tan(cone_angle_rad)
-                    z_vals = np.linspace(z_start, z_end, num_segm + 1)
-                else:
-                    z_vals = np.array([z_layer + c * np.sqrt(x ** 2 + y ** 2) * np.tan(cone_angle_rad) for x, y in zip(x_vals, y_vals)])
-                    if e_match and (np.max(z_vals) > z_max or z_max == 0):
-                        z_max = np.max(z_vals) # save hightes point with material extruded
-                    if e_match is None and np.max(z_vals) > z_max:
-                        np.minimum(z_vals, (z_max + 1), z_vals) # cut away all travel moves, that are higher than max height extruded + 1 mm safety
-                        # das hier könnte noch verschönert werden, in dem dann eine alle abgeschnittenen Werte mit einer einer geraden Linie ersetzt werden
-
-                distances_transformed = dist_transformed / num_segm * np.ones(num_segm)
-                distances_bt = np.array(
-                    [np.linalg.norm([x_vals[i] - x_vals[i - 1], y_vals[i] - y_vals[i - 1], z_vals[i] - z_vals[i - 1]])
-                     for i in range(1, num_segm + 1)])
+                linear_z = inward_cone and not has_e and (update_x or update_y)
+                x_vals, y_vals, z_vals, distances_bt, z_max = _compute_segment(
+                    x_old_bt, y_old_bt, x_new_bt, y_new_bt, z_layer, c, tan_angle, num_segm, linear_z, has_e, z_max)
+                dist_segment = dist_transformed / num_segm
 
                 # Replace new row with num_seg new rows for movements and possible command rows for the U value
-                row = insert_Z(row, z_vals[0])
-                row = replace_E(row, num_segm, 1, 1 * np.cos(cone_angle_rad))
-                replacement_rows = ''
+                row = insert_Z(row, f'Z{z_vals[0]:.3f}', find_fields(row))
+                row = replace_E(row, num_segm, 1, cos_angle)
+                fields = find_fields(row)
                 for j in range(0, num_segm):
-                    single_row = re.sub(pattern_X, 'X' + str(round(x_vals[j + 1], 3)), row)
-                    single_row = re.sub(pattern_Y, 'Y' + str(round(y_vals[j + 1], 3)), single_row)
-                    single_row = re.sub(pattern_Z, 'Z' + str(round(z_vals[j + 1], 3)), single_row)
-                    single_row = replace_E(single_row, distances_transformed[j], distances_bt[j], 1)
-                    replacement_rows = replacement_rows + single_row
-                row = replacement_rows
+                    replacements = []
+                    if 'X' in fields:
+                        replacements.append((fields['X'], f'X{x_vals[j + 1]:.3f}'))
+                    if 'Y' in fields:
+                        replacements.append((fields['Y'], f'Y{y_vals[j + 1]:.3f}'))
+                    if 'Z' in fields:
+                        replacements.append((fields['Z'], f'Z{z_vals[j + 1]:.3f}'))
+                    single_row = replace_fields(row, replacements)
+                    single_row = replace_E(single_row, dist_segment, distances_bt[j], 1)
+                    yield single_row
 
                 if update_x:
                     x_old = x_new
@@ -256,18 +305,104 @@ def backtransform_data_radial(data, cone_type, maximal_length, cone_angle_rad):
                     y_old = y_new
                     update_y = False
 
-                new_data.append(row)
 
-    return new_data
+def backtransform_state(data, state, cone_type, maximal_length, cone_angle_rad):
+    """
+    Compute the state of the backtransformation after the rows of data, without generating the new rows. The state
+    consists of the last x- and y-value, the z-value of the layer and the highest point with material extruded so far.
+    Only for extruding moves the segment has to be computed, since the highest point depends on it.
+    :param data: list
+        List of strings, describing each line of the GCode
+    :param state: tuple
+        State of the backtransformation before the first row
+    :param cone_type: string
+        String, either 'outward' or 'inward', defines which transformation should be used
+    :param maximal_length: float
+        Maximal length of a segment in the original GCode
+    :param cone_angle_rad: float
+        Angle of transformation cone in rad
+    :return: tuple
+        State of the backtransformation after the last row
+    """
+    x_old, y_old, z_layer, z_max = state
+    if cone_type == 'outward':
+        c = -1
+    elif cone_type == 'inward':
+        c = 1
+    else:
+        raise ValueError('{} is not a admissible type for the transformation'.format(cone_type))
+    cos_angle = math.cos(cone_angle_rad)
+    tan_angle = math.tan(cone_angle_rad)
 
+    for row in data:
+        if not row.startswith('G1 '):
+            continue
+        x_val, y_val, z_val, has_e = parse_movement(row)
+        if x_val is None and y_val is None and z_val is None:
+            continue
+        if z_val is not None:
+            z_layer = z_val
+        x_new = x_old if x_val is None else x_val
+        y_new = y_old if y_val is None else y_val
+        if has_e:
+            num_segm = int(math.hypot(x_new - x_old, y_new - y_old) // maximal_length + 1)
+            z_max = _compute_segment(x_old * cos_angle, y_old * cos_angle, x_new * cos_angle, y_new * cos_angle,
+                                     z_layer, c, tan_angle, num_segm, False, True, z_max)[4]
+        x_old, y_old = x_new, y_new
+
+    return x_old, y_old, z_layer, z_max
+
+
+def _backtransform_chunk(args):
+    """
+    Backtransform a chunk of rows in a worker process, args are the arguments of backtransform_rows_radial.
+    :return: list
+        Strings, which describe the new GCode of the chunk
+    """
+    return list(backtransform_rows_radial(*args))
+
+
+def backtransform_data_radial(data, cone_type, maximal_length, cone_angle_rad, processes=1):
+    """
+    Backtransform GCode with the radial angle computation, see backtransform_rows_radial. With more than one process,
+    the rows are divided into chunks; the state at the beginning of every chunk is computed in a serial pass, then the
+    chunks are backtransformed in parallel and their rows are yielded in the original order.
+    :param data: iterable
+        Strings, describing each line of the GCode, which is to be backtransformed
+    :param cone_type: string
+        String, either 'outward' or 'inward', defines which transformation should be used
+    :param maximal_length: float
+        Maximal length of a segment in the original GCode
+    :param cone_angle_rad: float
+        Angle of transformation cone in rad
+    :param processes: int
+        Number of processes used for the backtransformation
+    :return: generator
+        Strings, which describe the new GCode
+    """
+    state = (0, 0, 0, 0)
+    if processes <= 1:
+        yield from backtransform_rows_radial(data, state, cone_type, maximal_length, cone_angle_rad)
+        return
+
+    data = list(data)
+    chunk_size = max(1, math.ceil(len(data) / (4 * processes)))
+    chunks = []
+    for chunk_start in range(0, len(data), chunk_size):
+        chunk = data[chunk_start:chunk_start + chunk_size]
+        chunks.append((chunk, state, cone_type, maximal_length, cone_angle_rad))
+        state = backtransform_state(chunk, state, cone_type, maximal_length, cone_angle_rad)
+    with multiprocessing.Pool(processes) as pool:
+        for rows in pool.imap(_backtransform_chunk, chunks):
+            yield from rows
 
 
 def translate_data(data, cone_type, translate_x, translate_y, z_desired, e_parallel, e_perpendicular):
     """
     Translate the GCode in x- and y-direction. Only the lines, which describe a movement will be translated.
     Additionally, if z_translation is True, the z-values will be translated such that the minimal z-value is z_desired.
-    This happens by traversing the list of strings twice. If cone_type is 'inward', it is assured, that all moves
-    with no extrusion have at least a hight of z_desired.
+    The movements of the list of strings are read once, before the translated rows are generated. If cone_type is
+    'inward', it is assured, that all moves with no extrusion have at least a hight of z_desired.
     :param data: list
         List of strings, containing the GCode
     :param cone_type: string
@@ -282,58 +417,67 @@ def translate_data(data, cone_type, translate_x, translate_y, z_desired, e_paral
         Error parallel to nozzle
     :param e_perpendicular: float
         Error perpendicular to nozzle
-    :return: list
-        List of strings, which contains the translated GCode
+    :return: generator
+        Strings, which contain the translated GCode, row by row
     """
-    new_data = []
-    pattern_X = r'X[-0-9]*[.]?[0-9]*'
-    pattern_Y = r'Y[-0-9]*[.]?[0-9]*'
-    pattern_Z = r'Z[-0-9]*[.]?[0-9]*'
-    pattern_E = r'E[-0-9]*[.]?[0-9]*'
-    pattern_G = r'\AG[1] '
     z_initialized = False
     u_val = 0.0
 
-    for row in data:
-        g_match = re.search(pattern_G, row)
-        z_match = re.search(pattern_Z, row)
-        e_match = re.search(pattern_E, row)
-        if g_match is not None and z_match is not None and e_match is not None:
-            z_val = float(z_match.group(0).replace('Z', ''))
-            if not z_initialized:
-                z_min = z_val
-                z_initialized = True
-            if z_val < z_min:
-                z_min = z_val
+    # all movement rows are read first, while the minimal z-value of the extruding moves is tracked; then their new
+    # values are computed at once; missing values are nan
+    movements = [None] * len(data)
+    x_vals, y_vals, z_vals = [], [], []
+    for i, row in enumerate(data):
+
+        if row.startswith('G1 '):
+            fields = find_fields(row)
+            x_match = fields.get('X')
+            y_match = fields.get('Y')
+            z_match = fields.get('Z')
+            movements[i] = (x_match, y_match, z_match)
+            x_vals.append(np.nan if x_match is None else float(x_match.group(0)[1:]))
+            y_vals.append(np.nan if y_match is None else float(y_match.group(0)[1:]))
+            if z_match is None:
+                z_vals.append(np.nan)
+            else:
+                z_val = float(z_match.group(0)[1:])
+                z_vals.append(z_val)
+                if 'E' in fields:
+                    if not z_initialized:
+                        z_min = z_val
+                        z_initialized = True
+                    if z_val < z_min:
+                        z_min = z_val
     z_translate = z_desired - z_min
 
-    for row in data:
+    cos_u, sin_u = math.cos(u_val), math.sin(u_val)
+    x_vals = (np.array(x_vals) + translate_x - (e_parallel * cos_u) + (e_perpendicular * sin_u)).tolist()
+    y_vals = (np.array(y_vals) + translate_y - (e_parallel * sin_u) - (e_perpendicular * cos_u)).tolist()
+    z_vals = np.maximum(np.array(z_vals) + z_translate, z_desired).tolist()
 
-        x_match = re.search(pattern_X, row)
-        y_match = re.search(pattern_Y, row)
-        z_match = re.search(pattern_Z, row)
-        g_match = re.search(pattern_G, row)
+    k = 0
+    for row, movement in zip(data, movements):
 
-        if g_match is None:
-            new_data.append(row)
+        if movement is None:
+            yield row
 
         else:
+            x_match, y_match, z_match = movement
+            replacements = []
             if x_match is not None:
-                x_val = round(float(x_match.group(0).replace('X', '')) + translate_x - (e_parallel * np.cos(u_val)) + (e_perpendicular * np.sin(u_val)), 3)
-                row = re.sub(pattern_X, 'X' + str(x_val), row)
+                replacements.append((x_match, f'X{x_vals[k]:.3f}'))
             if y_match is not None:
-                y_val = round(float(y_match.group(0).replace('Y', '')) + translate_y - (e_parallel * np.sin(u_val)) - (e_perpendicular * np.cos(u_val)), 3)
-                row = re.sub(pattern_Y, 'Y' + str(y_val), row)
+                replacements.append((y_match, f'Y{y_vals[k]:.3f}'))
             if z_match is not None:
-                z_val = max(round(float(z_match.group(0).replace('Z', '')) + z_translate, 3), z_desired)
-                row = re.sub(pattern_Z, 'Z' + str(z_val), row)
-
-            new_data.append(row)
+                replacements.append((z_match, f'Z{z_vals[k]:.3f}'))
+            k += 1
+            row = replace_fields(row, replacements)
 
-    return new_data
+            yield row
 
 
-def backtransform_file(path, cone_type, maximal_length, angle_comp, x_shift, y_shift, cone_angle_deg, z_desired, e_parallel, e_perpendicular):
+def backtransform_file(path, cone_type, maximal_length, angle_comp, x_shift, y_shift, cone_angle_deg, z_desired, e_parallel, e_perpendicular,
+                       processes=1):
     """
     Read GCode from file, backtransform and translate it.
     :param path: string
@@ -343,7 +487,7 @@ def backtransform_file(path, cone_type, maximal_length, angle_comp, x_shift, y_s
     :param maximal_length: float
         Maximal length of a segment in the original GCode
     :param angle_comp: string
-        String, which describes the way, the angle is computed; one of 'radial', 'tangential', 'mixed'
+        String, which describes the way, the angle is computed; only 'radial' is implemented for variable angles
     :param x_shift: float
         Float, which describes the translation in x-direction
     :param y_shift: float
@@ -356,33 +500,37 @@ def backtransform_file(path, cone_type, maximal_length, angle_comp, x_shift, y_s
         Error parallel to nozzle
     :param e_perpendicular: float
         Error perpendicular to nozzle
+    :param processes: int
+        Number of processes used for the backtransformation
     :return: None
     """
     
     cone_angle_rad = cone_angle_deg / 180 * np.pi
 
-    if angle_comp == 'radial':
-        backtransform_data = backtransform_data_radial
+    if angle_comp != 'radial':
+        raise ValueError('{} is not a admissible type for the angle computation'.format(angle_comp))
 
+    # the input is streamed through the backtransformation; only its result is kept, since translate_data needs two
+    # passes over the data
     with open(path, 'r') as f_gcode:
-        data = f_gcode.readlines()
-    data_bt = backtransform_data(data, cone_type, maximal_length, cone_angle_rad)
-    data_bt_string = ''.join(data_bt)
-    data_bt = [row + ' \n' for row in data_bt_string.split('\n')]
-    data_bt = translate_data(data_bt, cone_type, x_shift, y_shift, z_desired, e_parallel, e_perpendicular)
-    data_bt_string = ''.join(data_bt)
+        data_bt = [row.rstrip('\n') + ' \n'
+                   for row in backtransform_data_radial(f_gcode, cone_type, maximal_length, cone_angle_rad, processes)]
 
     path_write = re.sub(r'gcodes', 'gcodes_backtransformed', path)
     path_write = re.sub(r'.gcode', '_bt_' + cone_type + '_' + angle_comp + '.gcode', path_write)
     print(path_write)
     with open(path_write, 'w+') as f_gcode_bt:
-        f_gcode_bt.write(data_bt_string)
+        f_gcode_bt.writelines(translate_data(data_bt, cone_type, x_shift, y_shift, z_desired, e_parallel,
+                                             e_perpendicular))
     print('File successfully backtransformed and translated.')
 
     return None
 
-starttime = time.time()
-backtransform_file(path=FOLDER_NAME + FILE_NAME, cone_type=CONE_TYPE, maximal_length=0.5, angle_comp='radial', x_shift=X_SHIFT, y_shift=Y_SHIFT,
-                   cone_angle_deg=CONE_ANGLE, z_desired=FIRST_LAYER_HEIGHT, e_parallel=0, e_perpendicular=0)
-endtime = time.time()
-print('GCode translated, time used:', endtime - starttime)
\ No newline at end of file
+# guarded, since worker processes may import this file
+if __name__ == '__main__':
+    starttime = time.time()
+    backtransform_file(path=FOLDER_NAME + FILE_NAME, cone_type=CONE_TYPE, maximal_length=0.5, angle_comp='radial', x_shift=X_SHIFT, y_shift=Y_SHIFT,
+                       cone_angle_deg=CONE_ANGLE, z_desired=FIRST_LAYER_HEIGHT, e_parallel=0, e_perpendicular=0,
+                       processes=PROCESSES)
+    endtime = time.time()
+    print('GCode translated, time used:', endtime - starttime)
\ No newline at end of file
@@ -1,60 +1,216 @@
+import math
+import multiprocessing
+from multiprocessing import shared_memory
 import numpy as np
-from stl import mesh
+from stl import mesh, Mode
 import time
 import os
 
+try:
+    from numba import njit, prange
+    _HAS_NUMBA = True
+except ImportError:  # numba is optional, without it the kernels are replaced by NumPy array operations
+    _HAS_NUMBA = False
 
-def refinement_one_triangle(triangle):
+try:
+    import cupy as cp
+    _HAS_CUPY = True
+except ImportError:  # cupy is optional, it is only needed for the refinement and transformation on the GPU
+    _HAS_CUPY = False
+
+
+if _HAS_NUMBA:
+    @njit(cache=True)
+    def _transform_point(x, y, z, sqrt_2, c):
+        """
+        Compute the cone-transformation of one point.
+        :param x: float
+        :param y: float
+        :param z: float
+        :param sqrt_2: float
+            square root of 2, of the type of the points
+        :param c: float
+            sign of the cone, 1 for 'outward' and -1 for 'inward', of the type of the points
+        :return: tuple
+            transformed x-, y- and z-value
+        """
+        return sqrt_2 * x, sqrt_2 * y, z + c * math.sqrt(x * x + y * y)
+
+    @njit(cache=True)
+    def _write_point(out, i, j, point):
+        """
+        Write a point as j-th corner of the i-th triangle of out.
+        :return: None
+        """
+        out[i, j, 0] = point[0]
+        out[i, j, 1] = point[1]
+        out[i, j, 2] = point[2]
+
+    @njit(parallel=True, cache=True)
+    def _transform_kernel(points, sqrt_2, c, out):
+        """
+        Write the cone-transformation of every point into out, in parallel over the points.
+        :param points: array
+            array of points of shape ( , 3)
+        :param sqrt_2: float
+            square root of 2, of the type of the points
+        :param c: float
+            sign of the cone, 1 for 'outward' and -1 for 'inward', of the type of the points
+        :param out: array
+            array of the same shape as points, in which the transformed points are written
+        :return: None
+        """
+        for i in prange(points.shape[0]):
+            out[i, 0], out[i, 1], out[i, 2] = _transform_point(points[i, 0], points[i, 1], points[i, 2], sqrt_2, c)
+
+    @njit(parallel=True, cache=True)
+    def _subdivide_transform_kernel(triangle_array, lattice_weights, corner_index, sqrt_2, c, out):
+        """
+        Subdivide every triangle according to subdivision_lattice and write the cone-transformation of the resulting
+        triangles into out, in parallel over the triangles. The lattice points of a triangle are computed in double
+        precision, rounded to float32 and transformed once each; the subdivided but untransformed triangles are never
+        stored.
+        :param triangle_array: array
+            array of shape (num_triangles, 3, 3) of triangles of type float32
+        :param lattice_weights: array
+            array of shape (num_points, 3) of barycentric weights of the lattice points
+        :param corner_index: array
+            array of shape (num_subtriangles, 3) of the indices of the corners of the subtriangles in the lattice
+        :param sqrt_2: float
+            square root of 2, of type float32
+        :param c: float
+            sign of the cone, 1 for 'outward' and -1 for 'inward', of type float32
+        :param out: array
+            array of shape (num_triangles*num_subtriangles, 3, 3), in which the transformed triangles are written
+        :return: None
+        """
+        n_points = lattice_weights.shape[0]
+        n_sub = corner_index.shape[0]
+        for i in prange(triangle_array.shape[0]):
+            corners = triangle_array[i]
+            # transformed lattice points of this triangle, a small scratch array of each thread
+            points = np.empty((n_points, 3), dtype=np.float32)
+            for k in range(n_points):
+                w1, w2, w3 = lattice_weights[k, 0], lattice_weights[k, 1], lattice_weights[k, 2]
+                x = np.float32(w1 * corners[0, 0] + w2 * corners[1, 0] + w3 * corners[2, 0])
+                y = np.float32(w1 * corners[0, 1] + w2 * corners[1, 1] + w3 * corners[2, 1])
+                z = np.float32(w1 * corners[0, 2] + w2 * corners[1, 2] + w3 * corners[2, 2])
+                points[k, 0], points[k, 1], points[k, 2] = _transform_point(x, y, z, sqrt_2, c)
+            for m in range(n_sub):
+                for j in range(3):
+                    _write_point(out, n_sub * i + m, j, points[corner_index[m, j]])
+
+    @njit(parallel=True, cache=True)
+    def _normals_kernel(triangle_array, out):
+        """
+        Compute the normal of every triangle as the cross product of two edges, in parallel over the triangles.
+        :param triangle_array: array
+            array of shape (num_triangles, 3, 3) of triangles of type float32
+        :param out: array
+            array of shape (num_triangles, 3), in which the normals are written
+        :return: None
+        """
+        for i in prange(triangle_array.shape[0]):
+            ax = triangle_array[i, 1, 0] - triangle_array[i, 0, 0]
+            ay = triangle_array[i, 1, 1] - triangle_array[i, 0, 1]
+            az = triangle_array[i, 1, 2] - triangle_array[i, 0, 2]
+            bx = triangle_array[i, 2, 0] - triangle_array[i, 0, 0]
+            by = triangle_array[i, 2, 1] - triangle_array[i, 0, 1]
+            bz = triangle_array[i, 2, 2] - triangle_array[i, 0, 2]
+            out[i, 0] = ay * bz - az * by
+            out[i, 1] = az * bx - ax * bz
+            out[i, 2] = ax * by - ay * bx
+
+
+def refinement_one_triangle(triangle_array):
     """
-    Compute a refinement of one triangle. On every side, the midpoint is added. The three corner points and three
-    midpoints result in four smaller triangles.
-    :param triangle: array
-        array of three points of shape (3, 3) (one triangle)
+    Compute a refinement of every triangle of an array. On every side, the midpoint is added. The three corner points
+    and three midpoints result in four smaller triangles. It is only applied to the barycentric weights of the corners,
+    to define the order of the triangles of subdivision_lattice, with which triangulations are refined in one step.
+    :param triangle_array: array
+        array of shape (num_triangles, 3, 3) of triangles
     :return: array
-        array of shape (4, 3, 3) of four triangles
+        array of shape (num_triangles*4, 3, 3) of triangles, the four triangles of each input triangle in a row
     """
-    point1 = triangle[0]
-    point2 = triangle[1]
-    point3 = triangle[2]
+    point1 = triangle_array[:, 0]
+    point2 = triangle_array[:, 1]
+    point3 = triangle_array[:, 2]
     midpoint12 = (point1 + point2) / 2
     midpoint23 = (point2 + point3) / 2
     midpoint31 = (point3 + point1) / 2
-    triangle1 = np.array([point1, midpoint12, midpoint31])
-    triangle2 = np.array([point2, midpoint23, midpoint12])
-    triangle3 = np.array([point3, midpoint31, midpoint23])
-    triangle4 = np.array([midpoint12, midpoint23, midpoint31])
-    return np.array([triangle1, triangle2, triangle3, triangle4])
+    out = np.empty((triangle_array.shape[0] * 4, 3, 3), dtype=np.result_type(triangle_array, 0.5))
+    out[0::4, 0] = point1
+    out[0::4, 1] = midpoint12
+    out[0::4, 2] = midpoint31
+    out[1::4, 0] = point2
+    out[1::4, 1] = midpoint23
+    out[1::4, 2] = midpoint12
+    out[2::4, 0] = point3
+    out[2::4, 1] = midpoint31
+    out[2::4, 2] = midpoint23
+    out[3::4, 0] = midpoint12
+    out[3::4, 1] = midpoint23
+    out[3::4, 2] = midpoint31
+    return out
 
 
-def refinement_triangulation(triangle_array, num_iterations):
+def subdivision_lattice(num_iterations):
     """
-    Compute a refinement of a triangulation using the refinement_four_triangles function.
-    The number of iteration defines, how often the triangulation has to be refined; n iterations lead to
-    4^n times many triangles.
-    :param triangle_array: array
-        array of shape (num_triangles, 3, 3) of triangles
+    Compute the subdivision of one triangle, which results from refining it num_iterations times with the
+    refinement_one_triangle function. The corners of the resulting triangles lie on a triangular lattice with 2^n
+    segments per side; every lattice point is given by its barycentric weights and every resulting triangle by the
+    indices of its corners. The triangles are in the same order as with refinement_one_triangle, which is applied
+    to the triangle with the unit vectors as corners.
     :param num_iterations: int
-    :return: array
-        array of shape (num_triangles*4^num_iterations, 3, 3) of triangles
+    :return: tuple
+        array of shape (num_points, 3) of barycentric weights of the lattice points and array of shape
+        (4^num_iterations, 3) of the indices of the corners of the triangles
     """
-    refined_array = triangle_array
+    corner_weights = np.eye(3)[np.newaxis]
     for i in range(0, num_iterations):
-        n_triangles = refined_array.shape[0] * 4
-        refined_array = np.array(list(map(refinement_one_triangle, refined_array)))
-        refined_array = np.reshape(refined_array, (n_triangles, 3, 3))
-    return refined_array
+        corner_weights = refinement_one_triangle(corner_weights)
+    n_segments = 2**num_iterations
+    # the lattice points are numbered row by row, where the second and third weight times n_segments are (a, b)
+    a, b = np.meshgrid(np.arange(n_segments + 1), np.arange(n_segments + 1), indexing='ij')
+    a, b = a[a + b <= n_segments], b[a + b <= n_segments]
+    lattice_weights = np.stack((n_segments - a - b, a, b), axis=1) / n_segments
+    a = np.rint(corner_weights[:, :, 1] * n_segments).astype(np.int64)
+    b = np.rint(corner_weights[:, :, 2] * n_segments).astype(np.int64)
+    corner_index = a * (n_segments + 1) - a * (a - 1) // 2 + b
+    return lattice_weights, corner_index
 
 
-def transformation_cone(points, cone_type):
+def gather_triangles(points, corner_index, out=None):
     """
-    Compute the cone-transformation (x', y', z') = (\sqrt{2}x, \sqrt{2}y, z + \sqrt{x^{2} + y^{2}}) ('outward') or
-    (x', y', z') = (\sqrt{2}x, \sqrt{2}y, z - \sqrt{x^{2} + y^{2}}) ('inward') for a list of points
+    Gather the refined triangles from the lattice points of every triangle. The same corner indices are taken along
+    the lattice axis of all triangles, such that no index array of the size of the output is needed.
     :param points: array
-        array of points of shape ( , 3)
+        array of shape (num_triangles, num_points, 3) of lattice points
+    :param corner_index: array
+        array of shape (num_subtriangles, 3) of the indices of the corners, as returned by subdivision_lattice
+    :param out: array
+        optional array of shape (num_triangles*num_subtriangles, 3, 3), in which the triangles are written
+    :return: array
+        array of shape (num_triangles*num_subtriangles, 3, 3) of triangles
+    """
+    if out is None:
+        return np.reshape(np.take(points, corner_index, axis=1), (-1, 3, 3))
+    refined_array, is_view = _reshaped_out(out, (points.shape[0], -1, 3, 3))
+    # the indices are valid, mode='clip' only avoids the buffering of out
+    np.take(points, corner_index, axis=1, out=refined_array, mode='clip')
+    if not is_view:
+        out[...] = np.reshape(refined_array, out.shape)
+    return out
+
+
+def cone_sign(cone_type):
+    """
+    Get the sign of the cone-transformation, which is the only difference between the two types of cones. The type of
+    the cone is checked only here, the transformation itself is the same for both types.
     :param cone_type: string
         String, either 'outward' or 'inward', defines which transformation should be used
-    :return: array
-        array of transformed points, of same shape as input array
+    :return: float
+        1 for 'outward' and -1 for 'inward', of type float32 (as in STL files)
     """
     if cone_type == 'outward':
         c = 1
@@ -62,12 +218,227 @@ def transformation_cone(points, cone_type):
         c = -1
     else:
         raise ValueError('{} is not a admissible type for the transformation'.format(cone_type))
-    T = (lambda x, y, z: np.array([np.sqrt(2) * x, np.sqrt(2) * y, z + c * np.sqrt(x ** 2 + y ** 2)]))
-    points_transformed = list(map(T, points[:, 0], points[:, 1], points[:, 2]))
-    return np.array(points_transformed)
+    return np.float32(c)
+
+
+def _reshaped_out(out, shape):
+    """
+    Reshape an array, into which results are written. np.reshape returns a copy instead of a view, if out is not
+    contiguous and the new shape cannot be expressed by its strides, e.g. for a strided slice or the 'vectors' field
+    of the data of a mesh; then results written into the reshaped array would be lost.
+    :param out: array
+        array, into which the results are written
+    :param shape: tuple
+        new shape of the array
+    :return: tuple
+        array of the given shape and a bool, which is False, if the array is a copy, which has to be copied back into
+        out with out[...] = np.reshape(array, out.shape)
+    """
+    reshaped = np.reshape(out, shape)
+    # a copy is newly allocated, i.e. it never overlaps with out
+    return reshaped, np.may_share_memory(reshaped, out)
+
+
+def transformation_cone(points, cone_type, out=None):
+    """
+    Compute the cone-transformation (x', y', z') = (\sqrt{2}x, \sqrt{2}y, z + \sqrt{x^{2} + y^{2}}) ('outward') or
+    (x', y', z') = (\sqrt{2}x, \sqrt{2}y, z - \sqrt{x^{2} + y^{2}}) ('inward') for a list of points
+    :param points: array
+        array of points of shape (..., 3), e.g. ( , 3) or (num_triangles, 3, 3)
+    :param cone_type: string
+        String, either 'outward' or 'inward', defines which transformation should be used
+    :param out: array
+        optional float32 array of the same shape as points, in which the transformed points are written; it may be
+        points itself
+    :return: array
+        array of transformed points of type float32 (as in STL files), of same shape as input array
+    """
+    c = cone_sign(cone_type)
+    sqrt_2 = np.float32(np.sqrt(2))
+    points_transformed = np.empty(points.shape, dtype=np.float32) if out is None else out
+    if _HAS_NUMBA:
+        # the kernel works on rows of points, which are views of the points, if these are contiguous
+        rows, is_view = _reshaped_out(points_transformed, (-1, 3))
+        _transform_kernel(np.reshape(points, (-1, 3)), sqrt_2, c, rows)
+        if not is_view:
+            points_transformed[...] = np.reshape(rows, points_transformed.shape)
+        return points_transformed
+
+    # z is written first, such that x and y are still available, if the points are transformed in place; the radius
+    # is the only temporary array
+    x = points[..., 0]
+    y = points[..., 1]
+    radius = np.multiply(x, x)
+    radius += np.square(y)
+    np.sqrt(radius, out=radius)
+    radius *= c
+    np.add(points[..., 2], radius, out=points_transformed[..., 2])
+    np.multiply(x, sqrt_2, out=points_transformed[..., 0])
+    np.multiply(y, sqrt_2, out=points_transformed[..., 1])
+    return points_transformed
+
+
+def refinement_transformation(triangle_array, num_iterations, cone_type, out=None, processes=1, gpu=False):
+    """
+    Refine a triangulation and transform it according to the cone-transformation. Every lattice point of
+    subdivision_lattice is transformed only once, before the refined triangles are gathered; with numba, this is done
+    in one kernel, such that the refined triangles are written only once. The points on an edge, which two triangles
+    share, are transformed for both of them, since the triangles of a STL file are not connected by indices.
+    :param triangle_array: array
+        array of shape (num_triangles, 3, 3) of triangles
+    :param num_iterations: int
+        number of iterations, the triangulation should be refined before the transformation
+    :param cone_type: string
+        String, either 'outward' or 'inward', defines which transformation should be used
+    :param out: array
+        optional float32 array of shape (num_triangles*4^num_iterations, 3, 3), in which the transformed triangles
+        are written; it does not need to be contiguous, e.g. the 'vectors' field of the data of a mesh
+    :param processes: int
+        Number of processes used without numba, each refining and transforming chunks of the triangles; the numba
+        kernel runs in parallel threads anyway
+    :param gpu: bool
+        if True, the triangles are refined and transformed on the GPU with CuPy, instead of numba or processes
+    :return: array
+        array of shape (num_triangles*4^num_iterations, 3, 3) of transformed triangles of type float32
+    """
+    triangle_array = triangle_array.astype(np.float32, copy=False)
+    if gpu:
+        if not _HAS_CUPY:
+            raise ImportError('cupy is required for the refinement and transformation on the GPU')
+        return _refinement_transformation_gpu(triangle_array, num_iterations, cone_type, out)
+    if processes > 1 and not _HAS_NUMBA:
+        return _refinement_transformation_pool(triangle_array, num_iterations, cone_type, out, processes)
+    lattice_weights, corner_index = subdivision_lattice(num_iterations)
+    if not _HAS_NUMBA:
+        # the lattice points are computed coordinate by coordinate, i.e. in an array of shape (3, num_triangles,
+        # num_points), such that the transformation works on contiguous columns of its view of shape (num_triangles,
+        # num_points, 3); this view is copied once for the gather
+        points = np.matmul(np.transpose(triangle_array, (2, 0, 1)), lattice_weights.T, dtype=np.float64)
+        points = np.moveaxis(points.astype(np.float32), 0, -1)
+        transformation_cone(points, cone_type, out=points)
+        return gather_triangles(np.ascontiguousarray(points), corner_index, out)
+
+    c = cone_sign(cone_type)
+    if out is None:
+        out = np.empty((triangle_array.shape[0] * corner_index.shape[0], 3, 3), dtype=np.float32)
+    _subdivide_transform_kernel(triangle_array, lattice_weights, corner_index, np.float32(np.sqrt(2)), c, out)
+    return out
+
+
+def _refinement_transformation_chunk(args):
+    """
+    Refine and transform a chunk of triangles in a worker process, args are the name and shape of the shared output
+    array, the index of the first refined triangle of the chunk in it and the arguments of refinement_transformation.
+    :return: None
+    """
+    shm_name, shape, start, triangle_array, num_iterations, cone_type = args
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    refinement_transformation(triangle_array, num_iterations, cone_type,
+                              out=shared[start:start + triangle_array.shape[0] * 4**num_iterations])
+    del shared
+    shm.close()
+    return None
+
+
+def _refinement_transformation_pool(triangle_array, num_iterations, cone_type, out, processes):
+    """
+    Refine and transform chunks of the triangles in parallel processes, see refinement_transformation. The workers
+    write into an array in shared memory, such that the refined triangles are not sent back to this process.
+    :return: array
+        array of shape (num_triangles*4^num_iterations, 3, 3) of transformed triangles of type float32
+    """
+    shape = (triangle_array.shape[0] * 4**num_iterations, 3, 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    chunk_size = max(1, math.ceil(triangle_array.shape[0] / (4 * processes)))
+    shm = shared_memory.SharedMemory(create=True, size=max(1, out.size * 4))
+    try:
+        chunks = []
+        for chunk_start in range(0, triangle_array.shape[0], chunk_size):
+            chunks.append((shm.name, shape, chunk_start * 4**num_iterations,
+                           triangle_array[chunk_start:chunk_start + chunk_size], num_iterations, cone_type))
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_refinement_transformation_chunk, chunks)
+        shared = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        out[:] = shared
+        del shared
+    finally:
+        shm.close()
+        shm.unlink()
+    return out
+
+
+def _refinement_transformation_gpu(triangle_array, num_iterations, cone_type, out):
+    """
+    Refine and transform the triangles on the GPU with CuPy, see refinement_transformation. The lattice points are
+    computed, transformed and gathered as in the NumPy path, but in the memory of the GPU; only the input triangles
+    and the transformed triangles are transferred.
+    :return: array
+        array of shape (num_triangles*4^num_iterations, 3, 3) of transformed triangles of type float32
+    """
+    c = cone_sign(cone_type)
+    lattice_weights, corner_index = subdivision_lattice(num_iterations)
+    triangles = cp.asarray(np.transpose(triangle_array, (2, 0, 1)), dtype=cp.float64)
+    points = cp.matmul(triangles, cp.asarray(lattice_weights.T)).astype(cp.float32)
+    del triangles
+    x, y, z = points
+    # z is written first, such that x and y are still available
+    z += c * cp.sqrt(x * x + y * y)
+    x *= np.float32(np.sqrt(2))
+    y *= np.float32(np.sqrt(2))
+    refined_array = cp.take(cp.transpose(points, (1, 2, 0)), cp.asarray(corner_index), axis=1)
+    refined_array = cp.asnumpy(cp.reshape(refined_array, (-1, 3, 3)))
+    if out is None:
+        return refined_array
+    out[:] = refined_array
+    return out
+
+
+def face_normals(triangle_array, out=None):
+    """
+    Compute the normals of the triangles in one pass, as the cross product of the edges from the first to the second
+    and from the first to the third point. As in numpy-stl, the normals are not normalised.
+    :param triangle_array: array
+        array of shape (num_triangles, 3, 3) of triangles of type float32
+    :param out: array
+        optional float32 array of shape (num_triangles, 3), in which the normals are written, e.g. the 'normals' field
+        of the data of a mesh
+    :return: array
+        array of shape (num_triangles, 3) of normals
+    """
+    if out is None:
+        out = np.empty((triangle_array.shape[0], 3), dtype=np.float32)
+    if _HAS_NUMBA:
+        _normals_kernel(triangle_array, out)
+        return out
+
+    out[:] = np.cross(triangle_array[:, 1] - triangle_array[:, 0], triangle_array[:, 2] - triangle_array[:, 0])
+    return out
+
+
+def read_triangles(path):
+    """
+    Read the triangles of a stl-file. A binary file is mapped into memory, such that its triangles are neither parsed
+    nor copied; other files, e.g. ASCII files, are read with numpy-stl.
+    :param path: string
+        path to the stl file
+    :return: array
+        array of shape (num_triangles, 3, 3) of triangles, read-only for binary files
+    """
+    with open(path, 'rb') as f:
+        f.seek(80)
+        count = f.read(4)
+    if len(count) == 4:
+        n_triangles = int(np.frombuffer(count, dtype='<u4')[0])
+        # the size is checked, since ASCII files may also have a count after 80 bytes by chance
+        if n_triangles > 0 and os.path.getsize(path) == 84 + n_triangles * mesh.Mesh.dtype.itemsize:
+            data = np.memmap(path, dtype=mesh.Mesh.dtype, mode='r', offset=84, shape=(n_triangles,))
+            return np.asarray(data['vectors'])
+    return mesh.Mesh.from_file(path, calculate_normals=False).vectors
 
 
-def transformation_STL_file(path, output_dir, cone_type, nb_iterations):
+def transformation_STL_file(path, output_dir, cone_type, nb_iterations, processes=1, gpu=False):
     """
     Read a stl-file, refine the triangulation, transform it according to the cone-transformation and save the
     transformed data.
@@ -79,26 +450,30 @@ def transformation_STL_file(path, output_dir, cone_type, nb_iterations):
         String, either 'outward' or 'inward', defines which transformation should be used
     :param nb_iterations: int
         number of iterations, the triangulation should be refined before the transformation
+    :param processes: int
+        Number of processes used for the refinement and transformation without numba
+    :param gpu: bool
+        if True, the triangulation is refined and transformed on the GPU, which needs CuPy
     :return: mesh object
         transformed triangulation as mesh object which can be stored as stl file
     """
     start = time.time()
-    my_mesh = mesh.Mesh.from_file(path)
-    vectors = my_mesh.vectors
-    vectors_refined = refinement_triangulation(vectors, nb_iterations)
-    vectors_refined = np.reshape(vectors_refined, (-1, 3))
-    vectors_transformed = transformation_cone(vectors_refined, cone_type)
-    vectors_transformed = np.reshape(vectors_transformed, (-1, 3, 3))
-    my_mesh_transformed = np.zeros(vectors_transformed.shape[0], dtype=mesh.Mesh.dtype)
-    my_mesh_transformed['vectors'] = vectors_transformed
-    my_mesh_transformed = mesh.Mesh(my_mesh_transformed)
+    vectors = read_triangles(path)
+    # the transformed triangles and their normals are written directly into the data of the mesh
+    data = np.empty(vectors.shape[0] * 4**nb_iterations, dtype=mesh.Mesh.dtype)
+    data['attr'] = 0
+    refinement_transformation(vectors, nb_iterations, cone_type, out=data['vectors'], processes=processes,
+                              gpu=gpu)
+    face_normals(data['vectors'], out=data['normals'])
+    my_mesh_transformed = mesh.Mesh(data, calculate_normals=False)
 
     if not os.path.exists(output_dir):
         os.mkdir(output_dir)
     file_name = file_path[file_path.rfind('/'):]
     file_name = file_name.replace('.stl', '_' + transformation_type + '_transformed.stl')
     output_path = output_dir + file_name
-    my_mesh_transformed.save(output_path)
+    # binary STL files are written with a single write of the data of the mesh, which is already complete
+    my_mesh_transformed.save(output_path, mode=Mode.BINARY, update_normals=False)
     end = time.time()
     print('STL file generated in {:.1f}s, saved in {}'.format(end - start, output_path))
     return None
@@ -113,10 +488,15 @@ file_path = '/path/to/stl/file.stl'
 dir_transformed = '/path/to/save/transformation/'
 transformation_type = 'inward'  # inward or outward
 number_iterations = 4   # number iterations for triangulation refinement
+n_processes = 1  # number of processes used for the refinement and transformation without numba
+use_gpu = False  # refinement and transformation on the GPU, needs CuPy
 
-# STL transformation function call
-transformation_STL_file(path=file_path,
-                        output_dir=dir_transformed,
-                        cone_type=transformation_type,
-                        nb_iterations=number_iterations,
-                        )
+# STL transformation function call (guarded, since worker processes may import this file)
+if __name__ == '__main__':
+    transformation_STL_file(path=file_path,
+                            output_dir=dir_transformed,
+                            cone_type=transformation_type,
+                            nb_iterations=number_iterations,
+                            processes=n_processes,
+                            gpu=use_gpu
+                            )